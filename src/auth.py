@@ -5,26 +5,228 @@ Authentication Module for Gmail API
 import os
 import json
 import logging
+import tempfile
+import threading
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+import requests
 import google.auth.exceptions
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Parse the token file with orjson when installed; both accept bytes.
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
 # Gmail API scopes - Keep consistent with other modules if needed elsewhere
-SCOPES = [
+# Immutable so the same object can be shared by every auth and refresh call.
+SCOPES = (
     'https://www.googleapis.com/auth/gmail.readonly',
     'https://www.googleapis.com/auth/gmail.send',
     'https://www.googleapis.com/auth/gmail.compose',
     'https://www.googleapis.com/auth/gmail.modify',
     'https://www.googleapis.com/auth/gmail.labels' # Added for label management
-]
+)
+_SCOPES_SET = frozenset(SCOPES)
+
+def _scopes_match(scopes) -> bool:
+    """Check whether the given scopes are exactly the scopes this server requests."""
+    if isinstance(scopes, str): # Space-delimited form used by some token files
+        scopes = scopes.split()
+    return frozenset(scopes) == _SCOPES_SET
+
+# One transport for all token refreshes, so the HTTP session (and its
+# keep-alive connection to the token endpoint) is reused between refreshes.
+_REFRESH_REQUEST = Request(session=requests.Session())
+# Serializes refreshes so inline and background refreshes of the same credentials don't race
+_REFRESH_LOCK = threading.Lock()
+
+# Access token and expiry last written to each token file
+_PERSISTED_TOKENS: Dict[str, Tuple[Optional[str], Optional[datetime]]] = {}
+# Modification time (ns) of each token file when this process last read or wrote it
+_TOKEN_MTIMES: Dict[str, int] = {}
+
+def _token_mtime(token_file: str) -> Optional[int]:
+    """Return the token file's modification time in nanoseconds, or None if it is missing."""
+    try:
+        return os.stat(token_file).st_mtime_ns
+    except OSError:
+        return None
+
+def token_file_changed(token_file: str) -> bool:
+    """Check whether the token file was rewritten by someone else since this process last read or wrote it.
+
+    A missing token file does not count as a change: credentials held in
+    memory stay usable and are written back on their next refresh.
+
+    Args:
+        token_file: Path to the token.json file.
+
+    Returns:
+        True if the file on disk may hold newer credentials than those in memory.
+    """
+    mtime = _token_mtime(token_file)
+    return mtime is not None and mtime != _TOKEN_MTIMES.get(token_file)
+
+def _atomic_write(path: str, data: str) -> None:
+    """Write data to path via a temporary file and rename, so readers never see a partial file.
+
+    The temporary file is created next to path (os.replace is only atomic within
+    one filesystem) with a unique name and owner-only permissions. No fsync is
+    done: the rename alone guarantees the previous token survives a crash.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _save_credentials(creds: Credentials, token_file: str) -> bool:
+    """Persist credentials to the token file unless that exact token was already saved.
+
+    Returns:
+        True if the file was written, False if it was already up to date.
+    """
+    state = (creds.token, creds.expiry)
+    if _PERSISTED_TOKENS.get(token_file) == state:
+        return False
+    _atomic_write(token_file, creds.to_json())
+    _PERSISTED_TOKENS[token_file] = state
+    _TOKEN_MTIMES[token_file] = _token_mtime(token_file)
+    return True
+
+def load_credentials(token_file: str) -> Optional[Credentials]:
+    """Loads stored credentials from the token file.
+
+    Args:
+        token_file: Path to the token.json file for storing/retrieving user credentials.
+
+    Returns:
+        The stored Credentials object (possibly expired) or None if missing or unreadable.
+    """
+    if not os.path.exists(token_file):
+        return None
+    try:
+        # Taken before reading, so a write racing with the read is seen as a change later
+        _TOKEN_MTIMES[token_file] = _token_mtime(token_file)
+        token_info = _json_loads(Path(token_file).read_bytes())
+        if not isinstance(token_info, dict):
+            raise ValueError("token file does not contain a JSON object")
+        # Ensure SCOPES matches the ones used to generate the token
+        if 'scopes' in token_info and not _scopes_match(token_info['scopes']):
+            logger.warning("Token file scopes differ from the requested scopes. Some API calls may be rejected.")
+        creds = Credentials.from_authorized_user_info(token_info, SCOPES)
+        logger.debug("Loaded credentials from token file.")
+        return creds
+    except ValueError as e: # Includes JSON decode errors
+         logger.warning(f"Error loading token file (likely scope mismatch or invalid format): {e}. Will attempt re-authentication.")
+         return None # Force re-authentication
+    except OSError as e:
+        logger.error(f"Error reading token file {token_file}: {e}")
+        return None # Force re-authentication
+
+def ensure_valid(creds: Credentials, token_file: str) -> bool:
+    """Makes sure in-memory credentials are valid, refreshing them in place if expired.
+
+    Does not read the token file; it is only written when a refresh succeeds,
+    or removed when the refresh token has been rejected.
+
+    Args:
+        creds: The credentials to check.
+        token_file: Path to the token.json file refreshed credentials are saved to.
+
+    Returns:
+        True if the credentials are valid afterwards, False otherwise.
+    """
+    if creds.valid:
+        return True
+    if not (creds.expired and creds.refresh_token):
+        return False
+
+    with _REFRESH_LOCK:
+        if creds.valid: # Refreshed by another thread while we waited
+            return True
+
+        logger.info("Credentials expired, attempting refresh.")
+        try:
+            creds.refresh(_REFRESH_REQUEST)
+            logger.info("Credentials refreshed successfully.")
+        except google.auth.exceptions.RefreshError as e:
+            logger.error(f"Error refreshing credentials: {e}. Need to re-authenticate.")
+            # If refresh fails, potentially delete the token file or prompt user
+            try:
+                os.remove(token_file)
+                logger.info(f"Removed invalid token file: {token_file}")
+            except OSError as rm_err:
+                 logger.error(f"Error removing invalid token file {token_file}: {rm_err}")
+            return False # Force re-authentication flow
+        except Exception as e:
+             logger.error(f"Unexpected error during credential refresh: {e}")
+             return False # Force re-authentication flow
+
+        # Save the refreshed credentials
+        try:
+            if _save_credentials(creds, token_file):
+                logger.debug("Saved refreshed credentials to token file.")
+        except Exception as e:
+            logger.error(f"Error saving refreshed credentials to token file: {e}")
+        return creds.valid
+
+def _run_auth_flow(credentials_file: str, token_file: str) -> Optional[Credentials]:
+    """Runs the interactive OAuth2 flow and saves the resulting credentials.
+
+    Args:
+        credentials_file: Path to the credentials.json file.
+        token_file: Path to the token.json file the new credentials are saved to.
+
+    Returns:
+        The new Credentials object or None if the flow fails.
+    """
+    logger.info("No valid credentials found, starting authentication flow.")
+    if not os.path.exists(credentials_file):
+        logger.error(f"Credentials file '{credentials_file}' not found. Cannot authenticate.")
+        return None
+    try:
+        # Imported here: oauthlib is only needed when there is no usable token
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        flow = InstalledAppFlow.from_client_secrets_file(
+            credentials_file, SCOPES)
+        # TODO: Consider how to handle the run_local_server part in a non-interactive server environment if needed.
+        # For now, assumes local execution context where browser can be opened.
+        creds = flow.run_local_server(port=0)
+        logger.info("Authentication flow completed successfully.")
+        # Save the new credentials for the next run
+        try:
+            _save_credentials(creds, token_file)
+            logger.info(f"Saved new credentials to token file: {token_file}")
+        except Exception as e:
+            logger.error(f"Error saving new credentials to token file: {e}")
+        return creds
+    except FileNotFoundError:
+         logger.error(f"Credentials secrets file not found at {credentials_file}")
+         return None
+    except Exception as e:
+        logger.error(f"Error during authentication flow: {e}")
+        return None # Authentication failed
 
 def authenticate_google_api(credentials_file: str, token_file: str) -> Optional[Credentials]:
     """Handles the OAuth2 flow and returns valid credentials.
 
+    Loads the token file, refreshes the credentials if needed, and falls back
+    to the interactive flow when there are no usable stored credentials.
+
     Args:
         credentials_file: Path to the credentials.json file.
         token_file: Path to the token.json file for storing/retrieving user credentials.
@@ -32,75 +234,11 @@ def authenticate_google_api(credentials_file: str, token_file: str) -> Optional[
     Returns:
         Valid Google OAuth2 Credentials object or None if authentication fails.
     """
-    creds = None
-
-    # Check if token file exists and load credentials
-    if os.path.exists(token_file):
-        try:
-            # Ensure SCOPES matches the ones used to generate the token
-            creds = Credentials.from_authorized_user_info(
-                json.loads(open(token_file).read()), SCOPES)
-            logger.debug("Loaded credentials from token file.")
-        except ValueError as e:
-             logger.warning(f"Error loading token file (likely scope mismatch or invalid format): {e}. Will attempt re-authentication.")
-             creds = None # Force re-authentication
-        except Exception as e:
-            logger.error(f"Unexpected error loading credentials from token file: {e}")
-            creds = None # Safer to force re-auth
+    creds = load_credentials(token_file)
 
     # If credentials don't exist or are invalid, get new ones
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            logger.info("Credentials expired, attempting refresh.")
-            try:
-                creds.refresh(Request())
-                logger.info("Credentials refreshed successfully.")
-                # Save the refreshed credentials
-                try:
-                    with open(token_file, 'w') as token:
-                        token.write(creds.to_json())
-                    logger.debug("Saved refreshed credentials to token file.")
-                except Exception as e:
-                    logger.error(f"Error saving refreshed credentials to token file: {e}")
-            except google.auth.exceptions.RefreshError as e:
-                logger.error(f"Error refreshing credentials: {e}. Need to re-authenticate.")
-                # If refresh fails, potentially delete the token file or prompt user
-                try:
-                    os.remove(token_file)
-                    logger.info(f"Removed invalid token file: {token_file}")
-                except OSError as rm_err:
-                     logger.error(f"Error removing invalid token file {token_file}: {rm_err}")
-                creds = None # Force re-authentication flow
-            except Exception as e:
-                 logger.error(f"Unexpected error during credential refresh: {e}")
-                 creds = None # Force re-authentication flow
-
-        # If still no valid credentials, need to run the authentication flow
-        if not creds or not creds.valid:
-            logger.info("No valid credentials found, starting authentication flow.")
-            if not os.path.exists(credentials_file):
-                logger.error(f"Credentials file '{credentials_file}' not found. Cannot authenticate.")
-                return None
-            try:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    credentials_file, SCOPES)
-                # TODO: Consider how to handle the run_local_server part in a non-interactive server environment if needed.
-                # For now, assumes local execution context where browser can be opened.
-                creds = flow.run_local_server(port=0)
-                logger.info("Authentication flow completed successfully.")
-                # Save the new credentials for the next run
-                try:
-                    with open(token_file, 'w') as token:
-                        token.write(creds.to_json())
-                    logger.info(f"Saved new credentials to token file: {token_file}")
-                except Exception as e:
-                    logger.error(f"Error saving new credentials to token file: {e}")
-            except FileNotFoundError:
-                 logger.error(f"Credentials secrets file not found at {credentials_file}")
-                 return None
-            except Exception as e:
-                logger.error(f"Error during authentication flow: {e}")
-                return None # Authentication failed
+    if not creds or not ensure_valid(creds, token_file):
+        creds = _run_auth_flow(credentials_file, token_file)
 
     # At this point, creds should be valid
     if creds and creds.valid:
@@ -108,4 +246,93 @@ def authenticate_google_api(credentials_file: str, token_file: str) -> Optional[
          return creds
     else:
          logger.error("Failed to obtain valid Google API credentials after all attempts.")
-         return None 
\ No newline at end of file
+         return None
+
+# Background refresh settings: refresh this long before expiry, checking at this interval (seconds)
+REFRESH_MARGIN = timedelta(minutes=5)
+REFRESH_CHECK_INTERVAL = 60
+
+class _TokenRefresher(threading.Thread):
+    """Daemon thread that refreshes credentials shortly before they expire.
+
+    The credentials object is refreshed in place, so any service built with it
+    picks up the new access token without blocking an API call on the refresh.
+    """
+
+    def __init__(self, creds: Credentials, token_file: str, interval: float = REFRESH_CHECK_INTERVAL):
+        super().__init__(name=f"TokenRefresher({token_file})", daemon=True)
+        self.creds = creds
+        self.token_file = token_file
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.refresh_if_due()
+
+    def stop(self):
+        """Ask the thread to exit at its next wake-up."""
+        self._stop_event.set()
+
+    def refresh_if_due(self) -> bool:
+        """Refresh the credentials if they expire within REFRESH_MARGIN.
+
+        Returns:
+            True if the credentials were refreshed, False otherwise.
+        """
+        if not self.creds.expiry or not self.creds.refresh_token:
+            return False
+        # google-auth stores expiry as a naive UTC datetime
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        if self.creds.expiry - now > REFRESH_MARGIN:
+            return False
+
+        with _REFRESH_LOCK:
+            if self.creds.expiry - datetime.now(timezone.utc).replace(tzinfo=None) > REFRESH_MARGIN:
+                return False # Refreshed by another thread while we waited
+            try:
+                self.creds.refresh(_REFRESH_REQUEST)
+                logger.info("Credentials refreshed in the background.")
+            except google.auth.exceptions.RefreshError as e:
+                # Revoked or expired grants do not recover by retrying, so stop instead of
+                # failing every interval; the inline refresh path takes over from here.
+                logger.error(f"Background credential refresh failed, stopping background refresh: {e}")
+                self.stop()
+                return False
+            except Exception as e:
+                logger.error(f"Unexpected error during background credential refresh: {e}")
+                return False
+            try:
+                if _save_credentials(self.creds, self.token_file):
+                    logger.debug("Saved background-refreshed credentials to token file.")
+            except Exception as e:
+                logger.error(f"Error saving refreshed credentials to token file: {e}")
+        return True
+
+_REFRESHERS: Dict[str, _TokenRefresher] = {}
+_REFRESHERS_LOCK = threading.Lock()
+
+def start_token_refresher(creds: Credentials, token_file: str) -> _TokenRefresher:
+    """Start a background refresher for creds, once per token file.
+
+    Inline refresh in authenticate_google_api remains the fallback if the
+    refresher has not run yet.
+
+    Args:
+        creds: The credentials to keep fresh (shared by reference with the service).
+        token_file: Path to the token.json file refreshed credentials are saved to.
+
+    Returns:
+        The running refresher thread.
+    """
+    with _REFRESHERS_LOCK:
+        refresher = _REFRESHERS.get(token_file)
+        if refresher and refresher.creds is creds and refresher.is_alive():
+            return refresher
+        if refresher:
+            refresher.stop() # Credentials were replaced, e.g. after re-authentication
+        refresher = _TokenRefresher(creds, token_file)
+        refresher.start()
+        _REFRESHERS[token_file] = refresher
+        logger.debug(f"Started background token refresher for {token_file}.")
+        return refresher
@@ -0,0 +1,120 @@
+"""
+Gmail Batch Request Helpers
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import Resource # For type hinting the service object
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest, build_http
+
+logger = logging.getLogger(__name__)
+
+# Gmail accepts at most 100 calls per batch request (lower than the generic 1000 limit).
+GMAIL_BATCH_LIMIT = 100
+
+# Upper bound on worker threads used when requests are executed individually
+MAX_CONCURRENT_REQUESTS = 8
+
+def _thread_http(http: Any) -> Any:
+    """Create a private copy of an authorized HTTP client for one worker thread.
+
+    httplib2 connections are not thread-safe, so concurrent requests must not
+    share the service's client. The copy shares the (thread-safe) credentials.
+    """
+    credentials = getattr(http, 'credentials', None)
+    if credentials is None:
+        return http
+    thread_http = build_http()
+    thread_http.timeout = getattr(getattr(http, 'http', None), 'timeout', thread_http.timeout)
+    return AuthorizedHttp(credentials, http=thread_http)
+
+def execute_concurrently(requests: List[Tuple[str, HttpRequest]],
+                         callback: Callable[[str, Any, Optional[Exception]], None],
+                         max_workers: int = MAX_CONCURRENT_REQUESTS) -> None:
+    """Execute API requests individually on a thread pool so their round trips overlap.
+
+    Args:
+        requests: List of (request_id, request) pairs.
+        callback: Called as callback(request_id, response, exception) for every
+                  request, in the order the requests were given.
+        max_workers: Maximum number of requests in flight at once.
+    """
+    if not requests:
+        return
+
+    local = threading.local()
+
+    def _execute(request: HttpRequest) -> Any:
+        if not hasattr(local, 'http'):
+            local.http = _thread_http(request.http)
+        return request.execute(http=local.http)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(requests))) as executor:
+        futures = [(request_id, executor.submit(_execute, request)) for request_id, request in requests]
+        for request_id, future in futures:
+            try:
+                response = future.result()
+            except Exception as e:
+                callback(request_id, None, e)
+            else:
+                callback(request_id, response, None)
+
+def _is_transient(error: Optional[Exception]) -> bool:
+    """Whether an API error is a rate limit or server error worth retrying."""
+    return isinstance(error, HttpError) and (error.resp.status == 429 or error.resp.status >= 500)
+
+def execute_batch(service: Resource,
+                  requests: List[Tuple[str, HttpRequest]],
+                  callback: Callable[[str, Any, Optional[Exception]], None]) -> None:
+    """Execute API requests through Gmail's batch endpoint.
+
+    Requests are sent in chunks of GMAIL_BATCH_LIMIT, so each chunk costs a
+    single HTTP round trip instead of one round trip per request. If a batch
+    request itself is rejected, that chunk falls back to execute_concurrently.
+    Requests that fail inside a batch with a rate limit or server error are
+    retried individually, where the service's request builder applies backoff.
+
+    Args:
+        service: Authorized Google API service instance.
+        requests: List of (request_id, request) pairs. Request IDs must be unique.
+        callback: Called as callback(request_id, response, exception) for every
+                  request, in the order the requests were given (also when some were retried).
+    """
+    for start in range(0, len(requests), GMAIL_BATCH_LIMIT):
+        chunk = requests[start:start + GMAIL_BATCH_LIMIT]
+        chunk_requests = dict(chunk)
+        # (response, exception) per request ID, reported once the whole chunk is done
+        outcomes = {}
+        retry = []
+
+        def _on_response(request_id: str, response: Any, exception: Optional[Exception]):
+            if _is_transient(exception):
+                retry.append((request_id, chunk_requests[request_id]))
+            else:
+                outcomes[request_id] = (response, exception)
+
+        def _on_retry(request_id: str, response: Any, exception: Optional[Exception]):
+            outcomes[request_id] = (response, exception)
+
+        batch = service.new_batch_http_request(callback=_on_response)
+        for request_id, request in chunk:
+            batch.add(request, request_id=request_id)
+        try:
+            batch.execute()
+            logger.debug(f"Executed batch of {len(chunk)} requests.")
+        except HttpError as e:
+            logger.warning(f"Batch request failed ({e}). Executing {len(chunk)} requests individually.")
+            execute_concurrently(chunk, callback)
+            continue
+
+        if retry:
+            logger.warning(f"{len(retry)} batched requests hit rate limits or server errors. Retrying them individually.")
+            execute_concurrently(retry, _on_retry)
+
+        for request_id, _ in chunk:
+            callback(request_id, *outcomes[request_id])
@@ -1,6 +1,8 @@
-import base64
+import binascii
+import io
 import logging
 from typing import Optional, Dict, List, Any
+from email.generator import BytesGenerator
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase # For creating attachment parts
@@ -8,8 +10,14 @@ from email.mime.base import MIMEBase # For creating attachment parts
 from googleapiclient.discovery import Resource
 from googleapiclient.errors import HttpError
 
+from .batch import execute_batch
+from .resources import user_resource
+
 logger = logging.getLogger(__name__)
 
+# Maps standard base64 output to the URL-safe alphabet the Gmail API expects
+_URLSAFE_TRANS = bytes.maketrans(b'+/', b'-_')
+
 def _create_mime_message(to: str, subject: str, body: str) -> str:
     """Creates a MIME message.
 
@@ -24,33 +32,47 @@ def _create_mime_message(to: str, subject: str, body: str) -> str:
     message = MIMEText(body, _charset='utf-8')
     message['to'] = to
     message['subject'] = subject
-    return base64.urlsafe_b64encode(message.as_bytes()).decode()
-
-def list_drafts(service: Resource, max_results: int = 10) -> List[Dict[str, Any]]:
+    # Flatten into one buffer and encode straight from a view of it,
+    # instead of copying the serialized message into a separate bytes object.
+    buffer = io.BytesIO()
+    BytesGenerator(buffer, mangle_from_=False, policy=message.policy).flatten(message)
+    # One C-level encode pass plus a table translate; padding is kept (Gmail accepts it)
+    return binascii.b2a_base64(buffer.getbuffer(), newline=False).translate(_URLSAFE_TRANS).decode('ascii')
+
+def list_drafts(service: Resource, max_results: int = 10, format: str = 'metadata') -> List[Dict[str, Any]]:
     """Lists draft emails.
 
     Args:
         service: The authenticated Gmail API service instance.
         max_results: Maximum number of drafts to return.
+        format: Gmail format for each draft. The default 'metadata' returns only
+                headers and snippet; pass 'full' to also get the message bodies.
+                drafts.get takes no metadataHeaders filter, so every header is returned.
 
     Returns:
         A list of draft dictionaries.
     """
     drafts_list = []
     try:
-        results = service.users().drafts().list(userId='me', maxResults=max_results).execute()
+        results = user_resource(service, 'drafts').list(userId='me', maxResults=max_results).execute()
         draft_summaries = results.get('drafts', [])
         if not draft_summaries:
             logger.info("No drafts found.")
             return []
 
-        for draft_summary in draft_summaries:
-            try:
-                draft = service.users().drafts().get(userId='me', id=draft_summary['id'], format='full').execute()
-                drafts_list.append(draft)
-            except HttpError as error:
-                logger.error(f"An API error occurred while fetching draft {draft_summary['id']}: {error}")
-                # Continue to fetch other drafts
+        def _on_draft(draft_id: str, draft: Optional[Dict[str, Any]], error: Optional[Exception]):
+            if error is not None:
+                logger.error(f"An API error occurred while fetching draft {draft_id}: {error}")
+                return # Continue with the other drafts
+            drafts_list.append(draft)
+
+        # Fetch all drafts through the batch endpoint instead of one round trip per draft
+        requests = [
+            (draft_summary['id'],
+             user_resource(service, 'drafts').get(userId='me', id=draft_summary['id'], format=format))
+            for draft_summary in draft_summaries
+        ]
+        execute_batch(service, requests, _on_draft)
         logger.info(f"Successfully retrieved {len(drafts_list)} drafts.")
         return drafts_list
     except HttpError as error:
@@ -68,7 +90,7 @@ def get_draft(service: Resource, draft_id: str) -> Optional[Dict[str, Any]]:
         A dictionary containing the draft details or None if not found or on error.
     """
     try:
-        draft = service.users().drafts().get(userId='me', id=draft_id, format='full').execute()
+        draft = user_resource(service, 'drafts').get(userId='me', id=draft_id, format='full').execute()
         logger.info(f"Successfully retrieved draft with ID: {draft_id}")
         return draft
     except HttpError as error:
@@ -93,7 +115,7 @@ def create_draft(service: Resource, to: str, subject: str, body: str) -> Optiona
     try:
         raw_message = _create_mime_message(to, subject, body)
         message_body = {'message': {'raw': raw_message}}
-        draft = service.users().drafts().create(userId='me', body=message_body).execute()
+        draft = user_resource(service, 'drafts').create(userId='me', body=message_body).execute()
         logger.info(f"Successfully created draft with ID: {draft.get('id')}")
         return draft
     except HttpError as error:
@@ -118,7 +140,7 @@ def update_draft(service: Resource, draft_id: str, to: str, subject: str, body:
         message_body = {'message': {'raw': raw_message}}
         # Note: The API for update requires the draft_id in the URL, not in the body.
         # The body for update is just the message.
-        draft = service.users().drafts().update(userId='me', id=draft_id, body=message_body).execute()
+        draft = user_resource(service, 'drafts').update(userId='me', id=draft_id, body=message_body).execute()
         logger.info(f"Successfully updated draft with ID: {draft_id}")
         return draft
     except HttpError as error:
@@ -139,7 +161,7 @@ def delete_draft(service: Resource, draft_id: str) -> bool:
         True on success, False on failure.
     """
     try:
-        service.users().drafts().delete(userId='me', id=draft_id).execute()
+        user_resource(service, 'drafts').delete(userId='me', id=draft_id).execute()
         logger.info(f"Successfully deleted draft with ID: {draft_id}")
         return True
     except HttpError as error:
@@ -149,6 +171,36 @@ def delete_draft(service: Resource, draft_id: str) -> bool:
             logger.error(f"An API error occurred while deleting draft {draft_id}: {error}")
         return False
 
+def batch_delete_drafts(service: Resource, draft_ids: List[str]) -> Dict[str, Any]:
+    """Deletes multiple drafts using Gmail batch requests.
+
+    Args:
+        service: The authenticated Gmail API service instance.
+        draft_ids: The IDs of the drafts to delete.
+
+    Returns:
+        Dictionary with counts of successful and failed deletions, and list of failed IDs.
+    """
+    if not draft_ids:
+        return {"success": 0, "failed": 0, "failed_ids": []}
+
+    deleted_ids = []
+    failed_ids = []
+
+    def _on_delete(draft_id: str, response: Any, error: Optional[Exception]):
+        if error is not None:
+            logger.error(f"An API error occurred while deleting draft {draft_id}: {error}")
+            failed_ids.append(draft_id)
+        else:
+            deleted_ids.append(draft_id)
+
+    requests = [(draft_id, user_resource(service, 'drafts').delete(userId='me', id=draft_id))
+                for draft_id in draft_ids]
+    execute_batch(service, requests, _on_delete)
+
+    logger.info(f"Batch deleted {len(deleted_ids)} drafts, {len(failed_ids)} failed.")
+    return {"success": len(deleted_ids), "failed": len(failed_ids), "failed_ids": failed_ids}
+
 def send_draft(service: Resource, draft_id: str) -> Optional[Dict[str, Any]]:
     """Sends an existing draft.
 
@@ -161,7 +213,7 @@ def send_draft(service: Resource, draft_id: str) -> Optional[Dict[str, Any]]:
     """
     try:
         # The body for send is {'id': draft_id}
-        sent_message = service.users().drafts().send(userId='me', body={'id': draft_id}).execute()
+        sent_message = user_resource(service, 'drafts').send(userId='me', body={'id': draft_id}).execute()
         logger.info(f"Successfully sent draft with ID: {draft_id}. New message ID: {sent_message.get('id')}")
         return sent_message
     except HttpError as error:
@@ -5,74 +5,359 @@ This module provides a simplified interface to interact with the Gmail API,
 coordinating authentication and delegating actions to specific modules.
 """
 
+import copy
+import functools
+import inspect
 import logging
 import os # Added for path manipulation
-from typing import Dict, List, Any, Optional
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+from typing import Callable, Dict, Iterator, List, Any, Optional, Tuple
 
 # Import the specific functions/modules needed
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build, Resource
-from .auth import authenticate_google_api # Use relative import
+from googleapiclient.http import HttpRequest, build_http
+from googleapiclient.model import JsonModel
+from .auth import authenticate_google_api, ensure_valid, start_token_refresher, token_file_changed # Use relative import
 from . import messages # Import the whole module
 from . import labels   # Import the whole module
 from . import drafts   # Import the whole module
+from .message_store import MessageStore
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Parse API responses with orjson when installed; googleapiclient's stdlib json is used otherwise.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Credentials and built services shared by all GmailClient instances,
+# keyed by (credentials_file, token_file), so only the first client pays
+# for reading the token and building the service.
+_SERVICE_CACHE: Dict[Tuple[str, str], Tuple[Credentials, Resource]] = {}
+# Guards _SERVICE_CACHE and _SERVICE_KEY_LOCKS; held only for lookups and inserts
+_SERVICE_CACHE_LOCK = threading.Lock()
+# One lock per cache key, held while that key authenticates. The OAuth flow can
+# wait on a browser for minutes, and must not block clients for other token files.
+_SERVICE_KEY_LOCKS: Dict[Tuple[str, str], threading.Lock] = {}
+
+def _service_key_lock(cache_key: Tuple[str, str]) -> threading.Lock:
+    """Return the lock that serializes authentication for one (credentials_file, token_file) pair."""
+    with _SERVICE_CACHE_LOCK:
+        return _SERVICE_KEY_LOCKS.setdefault(cache_key, threading.Lock())
+
+# Timeout in seconds for each Gmail API HTTP call
+HTTP_TIMEOUT = 30
+
+# Retries (with googleapiclient's exponential backoff) for 429, 5xx and rate-limit 403 responses
+API_NUM_RETRIES = 3
+
+# POST methods that are safe to repeat; other POSTs (send, create) could duplicate their effect
+_IDEMPOTENT_POST_ACTIONS = ('/modify', '/batchModify', '/batchDelete', '/trash', '/untrash')
+
+class _RetryingHttpRequest(HttpRequest):
+    """HttpRequest that retries transient failures of idempotent calls by default.
+
+    Installed as the service's request builder, so every .execute() without an
+    explicit num_retries backs off and retries instead of failing on the first
+    rate-limit or server error. Sends and creates are never retried.
+    """
+
+    def execute(self, http=None, num_retries=None):
+        if num_retries is None:
+            num_retries = API_NUM_RETRIES if self.is_idempotent() else 0
+        return super().execute(http=http, num_retries=num_retries)
+
+    def is_idempotent(self) -> bool:
+        """Whether repeating this request cannot change its outcome."""
+        return self.method != 'POST' or urlparse(self.uri).path.endswith(_IDEMPOTENT_POST_ACTIONS)
+
+# Number of fetched messages each GmailClient keeps in memory
+MESSAGE_CACHE_SIZE = 256
+
+class _MessageCache:
+    """Thread-safe LRU cache of fetched messages, keyed by message ID."""
+
+    def __init__(self, max_size: int = MESSAGE_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached message, marking it most recently used, or None."""
+        with self._lock:
+            message = self._entries.get(message_id)
+            if message is not None:
+                self._entries.move_to_end(message_id)
+            return message
+
+    def put(self, message_id: str, message: Dict[str, Any]) -> None:
+        """Cache a message, evicting the least recently used one when full."""
+        with self._lock:
+            self._entries[message_id] = message
+            self._entries.move_to_end(message_id)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, message_ids: List[str]) -> None:
+        """Drop cached copies of messages that were changed or deleted."""
+        with self._lock:
+            for message_id in message_ids:
+                self._entries.pop(message_id, None)
+
+# Seconds a GmailClient reuses its label list before fetching it again
+LABEL_CACHE_TTL = 60
+
+# Seconds a GmailClient reuses a message listing for the same query; short, so new mail shows up quickly
+LISTING_CACHE_TTL = 30
+
+def _build_authorized_http(creds: Credentials) -> AuthorizedHttp:
+    """Create the authorized HTTP client shared by every call made through a service.
+
+    Args:
+        creds: Credentials used to authorize requests (refreshed in place when expired).
+
+    Returns:
+        An AuthorizedHttp wrapping a single keep-alive httplib2 connection pool.
+    """
+    http = build_http() # Same defaults googleapiclient would use (e.g. 308 handling)
+    http.timeout = HTTP_TIMEOUT
+    return AuthorizedHttp(creds, http=http)
+
+class _OrjsonModel(JsonModel):
+    """JsonModel that decodes response bodies with orjson.
+
+    orjson parses the raw response bytes directly, skipping the separate
+    UTF-8 decode. Bodies that are not JSON are handled by JsonModel as before.
+    """
+
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return super().deserialize(content)
+        if self._data_wrapper and "data" in body:
+            body = body["data"]
+        return body
+
+def _response_model() -> Optional[JsonModel]:
+    """Model for the Gmail service, or None to keep googleapiclient's default."""
+    return _OrjsonModel() if orjson is not None else None
+
+def _requires_auth(action: str, default: Any = None) -> Callable:
+    """Decorator for GmailClient delegation methods that need an authenticated service.
+
+    When the client is not authenticated, the call is logged and a default
+    returned instead of reaching the Gmail API.
+
+    Args:
+        action: What the method does, for the log message. Formatted with the
+                call's arguments, e.g. "get message {message_id}".
+        default: Value returned when not authenticated. If callable, it is called
+                 with the call's bound arguments (a dict) to build the value.
+    """
+    def decorator(method: Callable) -> Callable:
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.authenticated:
+                return method(self, *args, **kwargs)
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            logger.error(f"Not authenticated. Cannot {action.format(**bound.arguments)}.")
+            return default(bound.arguments) if callable(default) else default
+        return wrapper
+    return decorator
+
+def _all_failed(ids_argument: str) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Default for unauthenticated batch calls: report every requested ID as failed."""
+    # Return structure consistent with the batch functions in the API modules
+    return lambda args: {"success": 0, "failed": len(args[ids_argument]), "failed_ids": args[ids_argument]}
+
 class GmailClient:
     """Acts as a client facade for interacting with the Gmail API.
 
     Handles authentication and delegates API calls to specialized modules.
     """
 
-    def __init__(self, credentials_file: str, token_file: str):
+    def __init__(self, credentials_file: str, token_file: str, message_store_file: Optional[str] = None):
         """Initialize the Gmail client and authenticate.
 
         Args:
             credentials_file: Path to the credentials.json file.
             token_file: Path to the token.json file for storing/retrieving user credentials.
+            message_store_file: Optional. Path to a SQLite file in which fetched messages
+                                are kept across restarts. Not used when omitted.
         """
         self.credentials_file = credentials_file
         self.token_file = token_file
         self.service: Optional[Resource] = None # Type hint for the service object
+        # Only ever True while self.service is set, so delegation methods
+        # guard on this single flag.
         self.authenticated = False
+        # Messages fetched by get_message; a message's content never changes,
+        # and the label changes made through this client invalidate it.
+        self._message_cache = _MessageCache()
+        self._message_store = MessageStore(message_store_file) if message_store_file else None
+        # (monotonic fetch time, labels) from the last list_labels call; labels
+        # rarely change, and creating or deleting one through this client clears it.
+        self._labels_cache: Optional[Tuple[float, List[Dict[str, Any]]]] = None
+        self._labels_cache_lock = threading.Lock()
+        # (monotonic fetch time, messages) per (max_results, query) listed; sending,
+        # deleting or relabelling messages through this client clears it.
+        self._listings_cache: Dict[Tuple[int, str], Tuple[float, List[Dict[str, Any]]]] = {}
+        self._listings_cache_lock = threading.Lock()
+        # Bumped by every clear, so a listing fetched across a change is not cached
+        self._listings_generation = 0
         self._authenticate()
 
     def _authenticate(self): # Changed from public authenticate to internal _authenticate
-        """Authenticate with the Gmail API using the auth module."""
-        creds = authenticate_google_api(self.credentials_file, self.token_file)
+        """Authenticate with the Gmail API using the auth module.
 
-        if creds and creds.valid:
-            try:
-                # Build the Gmail API service using the obtained credentials
-                self.service = build('gmail', 'v1', credentials=creds)
+        Reuses the credentials and service cached by an earlier client for the
+        same credential files, refreshing those credentials in memory if needed;
+        the token file is only read when nothing usable is cached or another
+        process has rewritten it since (detected by its modification time).
+        """
+        cache_key = (self.credentials_file, self.token_file)
+        with _service_key_lock(cache_key):
+            # Clients for the same key wait here, so the one that authenticates first
+            # fills the cache and the others reuse it instead of starting another flow.
+            with _SERVICE_CACHE_LOCK:
+                cached = _SERVICE_CACHE.get(cache_key)
+            if cached and token_file_changed(self.token_file):
+                logger.info("GmailClient: Token file changed on disk, reloading credentials.")
+                cached = None
+            if cached and ensure_valid(cached[0], self.token_file):
+                self.service = cached[1]
                 self.authenticated = True
-                logger.info("GmailClient: Successfully authenticated and built Gmail service.")
-            except Exception as e:
-                logger.error(f"GmailClient: Error building Gmail service after authentication: {e}")
+                logger.debug("GmailClient: Reusing cached Gmail service.")
+                return
+
+            creds = authenticate_google_api(self.credentials_file, self.token_file)
+
+            if creds and creds.valid:
+                try:
+                    # Build the Gmail API service using the obtained credentials.
+                    # The discovery document bundled with the client library is used,
+                    # so no discovery fetch or file cache is involved.
+                    self.service = build('gmail', 'v1', http=_build_authorized_http(creds),
+                                         cache_discovery=False, static_discovery=True,
+                                         model=_response_model(), requestBuilder=_RetryingHttpRequest)
+                    self.authenticated = True
+                    with _SERVICE_CACHE_LOCK:
+                        _SERVICE_CACHE[cache_key] = (creds, self.service)
+                    # Keep the shared credentials fresh off the request path
+                    start_token_refresher(creds, self.token_file)
+                    logger.info("GmailClient: Successfully authenticated and built Gmail service.")
+                except Exception as e:
+                    logger.error(f"GmailClient: Error building Gmail service after authentication: {e}")
+                    self.service = None
+                    self.authenticated = False
+            else:
+                logger.error("GmailClient: Authentication failed. Check auth logs for details.")
                 self.service = None
                 self.authenticated = False
-        else:
-            logger.error("GmailClient: Authentication failed. Check auth logs for details.")
-            self.service = None
-            self.authenticated = False
 
     # --- Message Methods (Delegation) ---
 
+    @_requires_auth("list messages", default=lambda _: [])
     def list_messages(self, max_results: int = 10, query: str = "") -> List[Dict[str, Any]]:
-        """List messages. Delegates to the messages module."""
-        if not self.authenticated or not self.service:
-            logger.error("Not authenticated. Cannot list messages.")
-            return []
-        return messages.list_messages(self.service, max_results, query)
-
-    def get_message(self, message_id: str) -> Optional[Dict[str, Any]]:
-        """Get a specific message. Delegates to the messages module."""
-        if not self.authenticated or not self.service:
-            logger.error(f"Not authenticated. Cannot get message {message_id}.")
-            return None
-        return messages.get_message(self.service, message_id)
+        """List messages. Delegates to the messages module.
 
+        The result for a given max_results and query is reused for
+        LISTING_CACHE_TTL seconds, so repeated listings skip the API.
+        """
+        key = (max_results, query)
+        now = time.monotonic()
+        with self._listings_cache_lock:
+            cached = self._listings_cache.get(key)
+            generation = self._listings_generation
+        if cached and now - cached[0] < LISTING_CACHE_TTL:
+            logger.debug(f"Returning cached listing for query '{query}'.")
+            return list(cached[1]) # Copy, so callers can't alter the cached list
+        message_list = messages.list_messages(self.service, max_results, query)
+        if message_list: # An empty list may mean the request failed
+            with self._listings_cache_lock:
+                if generation == self._listings_generation: # Nothing changed while listing
+                    # Drop expired listings so queries that are not repeated don't accumulate
+                    self._listings_cache = {k: v for k, v in self._listings_cache.items()
+                                            if now - v[0] < LISTING_CACHE_TTL}
+                    self._listings_cache[key] = (now, message_list)
+        return list(message_list)
+
+    def _clear_listings(self) -> None:
+        """Forget cached listings after a change that can alter them.
+
+        Called once the change's API call has returned (or failed), so a listing
+        fetched while the change was in flight cannot be served afterwards.
+        """
+        with self._listings_cache_lock:
+            self._listings_cache.clear()
+            self._listings_generation += 1
+
+    @_requires_auth("list messages", default=lambda _: iter(()))
+    def iter_messages(self, max_results: int = 10, query: str = "") -> Iterator[Dict[str, Any]]:
+        """Iterate over messages page by page. Delegates to the messages module."""
+        return messages.iter_messages(self.service, max_results, query)
+
+    @_requires_auth("get message {message_id}")
+    def get_message(self, message_id: str, include_body: bool = True) -> Optional[Dict[str, Any]]:
+        """Get a specific message. Delegates to the messages module.
+
+        Repeated reads are served from an in-memory LRU cache. Label changes
+        made outside this client (e.g. reading the message elsewhere) are not
+        reflected in a cached copy. With include_body=False the body is not
+        decoded ('body' is None) unless a cached copy already has it.
+
+        With a message store, messages fetched in earlier runs are read from
+        disk; only their current labels are fetched from the API.
+        """
+        message = self._message_cache.get(message_id)
+        if message is not None:
+            logger.debug(f"Returning cached message {message_id}.")
+            return copy.deepcopy(message) # Copy, so callers can't alter the cached message
+        message = self._get_stored_message(message_id)
+        if message is None:
+            message = messages.get_message(self.service, message_id, include_body=include_body)
+            if message is None or not include_body: # Only complete messages are cached
+                return message
+            if self._message_store:
+                self._message_store.put(message)
+        self._message_cache.put(message_id, message)
+        return copy.deepcopy(message)
+
+    def _get_stored_message(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """Return a message from the persistent store with its labels brought up to date.
+
+        Returns None if there is no store, the message is not stored, or its
+        current state could not be fetched.
+        """
+        if not self._message_store:
+            return None
+        message = self._message_store.get(message_id)
+        if message is None:
+            return None
+        state = messages.get_message_state(self.service, message_id)
+        if state is None:
+            return None
+        if state['historyId'] != message.get('historyId'):
+            # Content never changes; only labels can have moved on since it was stored
+            message['labels'] = state['labelIds']
+            message['read'] = 'UNREAD' not in state['labelIds']
+            message['historyId'] = state['historyId']
+            self._message_store.put(message)
+        logger.debug(f"Returning stored message {message_id}.")
+        return message
+
+    @_requires_auth("send message to {to}")
     def send_message(self, to: str, subject: str, body: str, attachments: Optional[List[str]] = None) -> Optional[str]:
         """Send a new email, optionally with attachments. Delegates to the messages module.
 
@@ -85,119 +370,159 @@ class GmailClient:
         Returns:
             Message ID if successful, None otherwise.
         """
-        if not self.authenticated or not self.service:
-            logger.error(f"Not authenticated. Cannot send message to {to}.")
-            return None
-        return messages.send_message(self.service, to, subject, body, attachments=attachments)
-
-    def reply_to_message(self, message_id: str, body: str) -> Optional[str]:
+        try:
+            return messages.send_message(self.service, to, subject, body, attachments=attachments)
+        finally:
+            self._clear_listings()
+
+    @_requires_auth("reply to message {message_id}")
+    def reply_to_message(self, message_id: str, body: str,
+                         original_headers: Optional[Dict[str, str]] = None,
+                         thread_id: Optional[str] = None) -> Optional[str]:
         """Reply to an existing email. Delegates to the messages module."""
-        if not self.authenticated or not self.service:
-            logger.error(f"Not authenticated. Cannot reply to message {message_id}.")
-            return None
-        return messages.reply_to_message(self.service, message_id, body)
+        try:
+            return messages.reply_to_message(self.service, message_id, body, original_headers, thread_id)
+        finally:
+            self._clear_listings()
 
+    @_requires_auth("delete message {message_id}", default=False)
     def delete_message(self, message_id: str) -> bool:
         """Delete a specific email message. Delegates to the messages module."""
-        if not self.authenticated or not self.service:
-            logger.error(f"Not authenticated. Cannot delete message {message_id}.")
-            return False
-        return messages.delete_message(self.service, message_id)
-
+        self._message_cache.invalidate([message_id])
+        if self._message_store:
+            self._message_store.delete([message_id])
+        try:
+            return messages.delete_message(self.service, message_id)
+        finally:
+            self._clear_listings()
+
+    @_requires_auth("batch delete messages", default=_all_failed('message_ids'))
     def batch_delete_messages(self, message_ids: List[str]) -> Dict[str, Any]:
         """Delete multiple email messages. Delegates to the messages module."""
-        if not self.authenticated or not self.service:
-            logger.error("Not authenticated. Cannot batch delete messages.")
-            # Return structure consistent with the messages module on auth failure
-            return {"success": 0, "failed": len(message_ids), "failed_ids": message_ids}
-        return messages.batch_delete_messages(self.service, message_ids)
-
+        self._message_cache.invalidate(message_ids)
+        if self._message_store:
+            self._message_store.delete(message_ids)
+        try:
+            return messages.batch_delete_messages(self.service, message_ids)
+        finally:
+            self._clear_listings()
+
+    @_requires_auth("modify labels for message {message_id}")
     def modify_message_labels(self, message_id: str,
                               add_label_ids: Optional[List[str]] = None,
                               remove_label_ids: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
         """Add or remove labels from a message. Delegates to the messages module."""
-        if not self.authenticated or not self.service:
-             logger.error(f"Not authenticated. Cannot modify labels for message {message_id}.")
-             return None
-        return messages.modify_message_labels(self.service, message_id, add_label_ids, remove_label_ids)
+        self._message_cache.invalidate([message_id])
+        try:
+            return messages.modify_message_labels(self.service, message_id, add_label_ids, remove_label_ids)
+        finally:
+            self._clear_listings()
+
+    @_requires_auth("batch modify labels", default=_all_failed('message_ids'))
+    def batch_modify_message_labels(self, message_ids: List[str],
+                                    add_label_ids: Optional[List[str]] = None,
+                                    remove_label_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Add or remove labels on multiple messages. Delegates to the messages module."""
+        self._message_cache.invalidate(message_ids)
+        try:
+            return messages.batch_modify_message_labels(self.service, message_ids, add_label_ids, remove_label_ids)
+        finally:
+            self._clear_listings()
 
     # --- Label Methods (Delegation) ---
 
+    @_requires_auth("list labels", default=lambda _: [])
     def list_labels(self) -> List[Dict[str, Any]]:
-        """List all labels. Delegates to the labels module."""
-        if not self.authenticated or not self.service:
-            logger.error("Not authenticated. Cannot list labels.")
-            return []
-        return labels.list_labels(self.service)
+        """List all labels. Delegates to the labels module.
 
+        The result is reused for LABEL_CACHE_TTL seconds.
+        """
+        with self._labels_cache_lock:
+            cached = self._labels_cache
+            if cached and time.monotonic() - cached[0] < LABEL_CACHE_TTL:
+                return list(cached[1]) # Copy, so callers can't alter the cached list
+            label_list = labels.list_labels(self.service)
+            # An empty list means the request failed: every account has system labels
+            self._labels_cache = (time.monotonic(), label_list) if label_list else None
+            return list(label_list)
+
+    def _clear_labels(self) -> None:
+        """Forget the cached label list after creating or deleting a label.
+
+        Takes the cache lock, so a list_labels call already in flight stores
+        its result first and cannot overwrite the invalidation.
+        """
+        with self._labels_cache_lock:
+            self._labels_cache = None
+
+    @_requires_auth("get label {label_id}")
     def get_label(self, label_id: str) -> Optional[Dict[str, Any]]:
         """Get details for a specific label. Delegates to the labels module."""
-        if not self.authenticated or not self.service:
-            logger.error(f"Not authenticated. Cannot get label {label_id}.")
-            return None
         return labels.get_label(self.service, label_id)
 
+    @_requires_auth("create label '{name}'")
     def create_label(self, name: str,
                        label_list_visibility: str = 'labelShow',
                        message_list_visibility: str = 'show') -> Optional[Dict[str, Any]]:
         """Create a new label. Delegates to the labels module."""
-        if not self.authenticated or not self.service:
-            logger.error(f"Not authenticated. Cannot create label '{name}'.")
-            return None
-        # Pass along optional visibility params
-        return labels.create_label(self.service, name, label_list_visibility, message_list_visibility)
+        try:
+            # Pass along optional visibility params
+            return labels.create_label(self.service, name, label_list_visibility, message_list_visibility)
+        finally:
+            self._clear_labels()
 
+    @_requires_auth("delete label {label_id}", default=False)
     def delete_label(self, label_id: str) -> bool:
         """Delete an existing label. Delegates to the labels module."""
-        if not self.authenticated or not self.service:
-            logger.error(f"Not authenticated. Cannot delete label {label_id}.")
-            return False
-        return labels.delete_label(self.service, label_id)
+        try:
+            return labels.delete_label(self.service, label_id)
+        finally:
+            self._clear_labels()
 
     # --- Draft Methods (Delegation) ---
 
-    def list_drafts(self, max_results: int = 10) -> List[Dict[str, Any]]:
-        """List draft emails. Delegates to the drafts module."""
-        if not self.authenticated or not self.service:
-            logger.error("Not authenticated. Cannot list drafts.")
-            return []
-        return drafts.list_drafts(self.service, max_results)
+    @_requires_auth("list drafts", default=lambda _: [])
+    def list_drafts(self, max_results: int = 10, format: str = 'metadata') -> List[Dict[str, Any]]:
+        """List draft emails. Delegates to the drafts module.
 
+        Drafts are fetched with headers and snippet only unless format='full' is given.
+        """
+        return drafts.list_drafts(self.service, max_results, format=format)
+
+    @_requires_auth("get draft {draft_id}")
     def get_draft(self, draft_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific draft. Delegates to the drafts module."""
-        if not self.authenticated or not self.service:
-            logger.error(f"Not authenticated. Cannot get draft {draft_id}.")
-            return None
         return drafts.get_draft(self.service, draft_id)
 
+    @_requires_auth("create draft")
     def create_draft(self, to: str, subject: str, body: str) -> Optional[Dict[str, Any]]:
         """Create a new draft email. Delegates to the drafts module."""
-        if not self.authenticated or not self.service:
-            logger.error("Not authenticated. Cannot create draft.")
-            return None
         return drafts.create_draft(self.service, to, subject, body)
 
+    @_requires_auth("update draft {draft_id}")
     def update_draft(self, draft_id: str, to: str, subject: str, body: str) -> Optional[Dict[str, Any]]:
         """Update an existing draft. Delegates to the drafts module."""
-        if not self.authenticated or not self.service:
-            logger.error(f"Not authenticated. Cannot update draft {draft_id}.")
-            return None
         return drafts.update_draft(self.service, draft_id, to, subject, body)
 
+    @_requires_auth("delete draft {draft_id}", default=False)
     def delete_draft(self, draft_id: str) -> bool:
         """Delete a draft. Delegates to the drafts module."""
-        if not self.authenticated or not self.service:
-            logger.error(f"Not authenticated. Cannot delete draft {draft_id}.")
-            return False
         return drafts.delete_draft(self.service, draft_id)
 
+    @_requires_auth("batch delete drafts", default=_all_failed('draft_ids'))
+    def batch_delete_drafts(self, draft_ids: List[str]) -> Dict[str, Any]:
+        """Delete multiple drafts. Delegates to the drafts module."""
+        return drafts.batch_delete_drafts(self.service, draft_ids)
+
+    @_requires_auth("send draft {draft_id}")
     def send_draft(self, draft_id: str) -> Optional[Dict[str, Any]]:
         """Send an existing draft. Delegates to the drafts module."""
-        if not self.authenticated or not self.service:
-            logger.error(f"Not authenticated. Cannot send draft {draft_id}.")
-            return None
-        return drafts.send_draft(self.service, draft_id)
+        try:
+            return drafts.send_draft(self.service, draft_id)
+        finally:
+            self._clear_listings()
 
+    @_requires_auth("get attachment {attachment_id} from message {message_id}")
     def get_attachment(self, message_id: str, attachment_id: str, filename: str, download_path: Optional[str] = None) -> Optional[bytes]:
         """Fetches an attachment's data and optionally saves it to a file.
 
@@ -213,10 +538,6 @@ class GmailClient:
             If download_path is specified and saving is successful, it still returns
             the bytes of the attachment.
         """
-        if not self.authenticated or not self.service:
-            logger.error(f"Not authenticated. Cannot get attachment {attachment_id} from message {message_id}.")
-            return None
-
         logger.info(f"Attempting to fetch attachment {attachment_id} for message {message_id}.")
         attachment_data = messages.get_attachment_data(self.service, message_id, attachment_id)
 
@@ -232,10 +553,8 @@ class GmailClient:
 
             full_save_path = os.path.join(download_path, filename)
             try:
-                # Ensure the download directory exists
-                if not os.path.exists(download_path):
-                    os.makedirs(download_path) # Create directory if it doesn't exist
-                    logger.info(f"Created download directory: {download_path}")
+                # Ensure the download directory exists (single race-free call)
+                os.makedirs(download_path, exist_ok=True)
 
                 with open(full_save_path, 'wb') as f:
                     f.write(attachment_data)
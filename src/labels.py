@@ -2,13 +2,49 @@
 Gmail Label Management Module
 """
 
+import functools
+import inspect
 import logging
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
 from googleapiclient.discovery import Resource # For type hinting the service object
 import googleapiclient.errors
 
+from .resources import user_resource
+
 logger = logging.getLogger(__name__)
 
+def _handles_api_errors(action: str, default: Any = None,
+                        not_found: Optional[str] = None, conflict: Optional[str] = None) -> Callable:
+    """Decorator for label calls: log errors and return a default instead of raising.
+
+    Messages are formatted with the call's arguments, e.g. "getting label {label_id}".
+
+    Args:
+        action: What the function does, for error messages ("Error {action}: ...").
+        default: Value returned on error. If callable, it is called to build the value.
+        not_found: Warning logged instead of an error when the API answers 404.
+        conflict: Warning logged instead of an error when the API answers 409.
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                arguments = signature.bind(*args, **kwargs).arguments
+                status = e.resp.status if isinstance(e, googleapiclient.errors.HttpError) else None
+                warning = {404: not_found, 409: conflict}.get(status)
+                if warning:
+                    logger.warning(warning.format(**arguments))
+                else:
+                    logger.error(f"Error {action.format(**arguments)}: {e}")
+                return default() if callable(default) else default
+        return wrapper
+    return decorator
+
+@_handles_api_errors("listing labels", default=list)
 def list_labels(service: Resource) -> List[Dict[str, Any]]:
     """List all labels in the user\'s account.
 
@@ -18,15 +54,12 @@ def list_labels(service: Resource) -> List[Dict[str, Any]]:
     Returns:
         List of label dictionaries or empty list on error.
     """
-    try:
-        results = service.users().labels().list(userId='me').execute()
-        labels = results.get('labels', [])
-        logger.info(f"Retrieved {len(labels)} labels.")
-        return labels
-    except Exception as e:
-        logger.error(f"Error listing labels: {e}")
-        return []
+    results = user_resource(service, 'labels').list(userId='me').execute()
+    labels = results.get('labels', [])
+    logger.info(f"Retrieved {len(labels)} labels.")
+    return labels
 
+@_handles_api_errors("getting label {label_id}", not_found="Label with ID {label_id} not found.")
 def get_label(service: Resource, label_id: str) -> Optional[Dict[str, Any]]:
     """Get details for a specific label.
 
@@ -37,20 +70,11 @@ def get_label(service: Resource, label_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         Label dictionary or None if not found or on error.
     """
-    try:
-        label = service.users().labels().get(userId='me', id=label_id).execute()
-        logger.info(f"Retrieved details for label ID: {label_id}")
-        return label
-    except googleapiclient.errors.HttpError as e:
-        if e.resp.status == 404:
-            logger.warning(f"Label with ID {label_id} not found.")
-        else:
-            logger.error(f"Error getting label {label_id}: {e}")
-        return None
-    except Exception as e:
-        logger.error(f"Error getting label {label_id}: {e}")
-        return None
+    label = user_resource(service, 'labels').get(userId='me', id=label_id).execute()
+    logger.info(f"Retrieved details for label ID: {label_id}")
+    return label
 
+@_handles_api_errors("creating label '{name}'", conflict="Label with name '{name}' might already exist.")
 def create_label(service: Resource, name: str,
                    label_list_visibility: str = 'labelShow',
                    message_list_visibility: str = 'show') -> Optional[Dict[str, Any]]:
@@ -71,23 +95,12 @@ def create_label(service: Resource, name: str,
         'messageListVisibility': message_list_visibility
     }
 
-    try:
-        created_label = service.users().labels().create(userId='me', body=label_body).execute()
-        logger.info(f"Successfully created label \'{name}\' with ID: {created_label['id']}")
-        return created_label
-    except googleapiclient.errors.HttpError as e:
-         # Handle potential conflict (label name already exists)
-        if e.resp.status == 409:
-             logger.warning(f"Label with name \'{name}\' might already exist.")
-             # Optionally, try to find the existing label by name here if needed
-             # For now, just return None as the creation itself failed.
-        else:
-            logger.error(f"Error creating label \'{name}\': {e}")
-        return None
-    except Exception as e:
-        logger.error(f"Error creating label \'{name}\': {e}")
-        return None
+    created_label = user_resource(service, 'labels').create(userId='me', body=label_body).execute()
+    logger.info(f"Successfully created label \'{name}\' with ID: {created_label['id']}")
+    return created_label
 
+@_handles_api_errors("deleting label {label_id}", default=False,
+                     not_found="Label with ID {label_id} not found for deletion.")
 def delete_label(service: Resource, label_id: str) -> bool:
     """Delete an existing label.
 
@@ -98,19 +111,9 @@ def delete_label(service: Resource, label_id: str) -> bool:
     Returns:
         True if deletion was successful, False otherwise.
     """
-    try:
-        service.users().labels().delete(userId='me', id=label_id).execute()
-        logger.info(f"Successfully deleted label ID: {label_id}")
-        return True
-    except googleapiclient.errors.HttpError as e:
-        if e.resp.status == 404:
-            logger.warning(f"Label with ID {label_id} not found for deletion.")
-        else:
-             logger.error(f"Error deleting label {label_id}: {e}")
-        return False
-    except Exception as e:
-        logger.error(f"Error deleting label {label_id}: {e}")
-        return False
+    user_resource(service, 'labels').delete(userId='me', id=label_id).execute()
+    logger.info(f"Successfully deleted label ID: {label_id}")
+    return True
 
 # Note: modify_message_labels logically belongs more with messages,
-# as it modifies a message based on labels. It will be moved to messages.py 
\ No newline at end of file
+# as it modifies a message based on labels. It will be moved to messages.py
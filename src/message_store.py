@@ -0,0 +1,96 @@
+"""
+Persistent Message Store
+
+Keeps messages fetched by get_message in a local SQLite database, so their
+content does not have to be downloaded and parsed again after a restart.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Serialize stored messages with orjson when installed; stdlib json is used otherwise.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Stored in SQLite's user_version. A store written with another schema is a
+# cache, so it is dropped and rebuilt rather than migrated.
+SCHEMA_VERSION = 1
+
+def _dumps(message: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(message)
+    return json.dumps(message).encode('utf-8')
+
+def _loads(data: bytes) -> Dict[str, Any]:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+class MessageStore:
+    """SQLite-backed store of fetched messages, keyed by message ID.
+
+    A message's content never changes, but its labels do; the stored message
+    keeps its historyId so callers can tell whether the stored labels are current.
+    Storage errors are logged and treated as cache misses.
+    """
+
+    def __init__(self, path: str):
+        """Open (creating if needed) the store at path.
+
+        Args:
+            path: Path to the SQLite database file. Created readable by the owner only.
+        """
+        self.path = path
+        if not os.path.exists(path):
+            # Message bodies are private; create the file before SQLite does so it is owner-only
+            os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS messages")
+                self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS messages (id TEXT PRIMARY KEY, data BLOB NOT NULL)")
+
+    def get(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored message, or None if it is not stored."""
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT data FROM messages WHERE id = ?", (message_id,)).fetchone()
+            return _loads(row[0]) if row else None
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"Error reading message {message_id} from store: {e}")
+            return None
+
+    def put(self, message: Dict[str, Any]) -> None:
+        """Store a message as returned by messages.get_message, replacing any stored copy."""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO messages (id, data) VALUES (?, ?)",
+                    (message['id'], _dumps(message)))
+        except (sqlite3.Error, TypeError) as e:
+            logger.error(f"Error storing message {message.get('id')}: {e}")
+
+    def delete(self, message_ids: List[str]) -> None:
+        """Remove stored copies of the given messages, in one transaction."""
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany("DELETE FROM messages WHERE id = ?", [(i,) for i in message_ids])
+        except sqlite3.Error as e:
+            logger.error(f"Error removing {len(message_ids)} messages from store: {e}")
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
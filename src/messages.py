@@ -3,80 +3,230 @@ Gmail Message Management Module
 """
 
 import base64
+import email.utils
+import functools
+import itertools
 import logging
 import os # For os.path.basename
 import mimetypes # For guessing MIME type
-from typing import Dict, List, Any, Optional
+import re
+import urllib.parse
+from typing import BinaryIO, Dict, FrozenSet, Iterator, List, Any, Optional, Tuple
+from email.header import Header
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase # For creating attachment parts
-from email.encoders import encode_base64 # For encoding attachment payload
 
 from googleapiclient.discovery import Resource # For type hinting the service object
 import googleapiclient.errors
 
+from .batch import GMAIL_BATCH_LIMIT, execute_batch
+from .resources import user_resource
+
 logger = logging.getLogger(__name__)
 
+# Use the SIMD-accelerated pybase64 codec when installed; it mirrors the stdlib API.
+try:
+    import pybase64 as _base64_codec
+except ImportError:
+    _base64_codec = base64
+
+def _b64url_decode(data: str) -> bytes:
+    """Decode padded base64url data, rejecting characters outside the alphabet."""
+    return _base64_codec.b64decode(data, altchars=b'-_', validate=True)
+
+def _b64url_encode(data: bytes) -> bytes:
+    """Encode bytes as padded base64url."""
+    return _base64_codec.urlsafe_b64encode(data)
+
+# Longest line SMTP allows; longer body lines force base64 transfer encoding
+_MAX_LINE_LENGTH = 998
+
+# Line breaks in a plain text body. str.splitlines() would also split on form
+# feeds, vertical tabs and other separators that are ordinary body characters.
+_LINE_BREAK_PATTERN = re.compile(r'\r\n|\r|\n')
+
+# Line length header values are folded to, as the email package's generator does
+_HEADER_LINE_LENGTH = 78
+
+def _encode_header_value(name: str, value: str) -> str:
+    """Encode a header value for a raw message.
+
+    Non-ASCII text is RFC 2047-encoded. Values that would make the header line
+    longer than _HEADER_LINE_LENGTH are folded at whitespace onto CRLF + space
+    continuation lines, which keeps e.g. the References of a long thread under
+    the 998-character line limit.
+
+    Raises:
+        ValueError: If the value contains a line break (header injection).
+    """
+    if '\r' in value or '\n' in value:
+        raise ValueError(f"Header value contains a line break: {value!r}")
+    if value.isascii():
+        if len(name) + 2 + len(value) <= _HEADER_LINE_LENGTH:
+            return value
+        return Header(value, header_name=name, maxlinelen=_HEADER_LINE_LENGTH).encode(linesep='\r\n')
+    # Fold long encoded values with CRLF, like every other line of the raw message
+    return Header(value, 'utf-8', header_name=name, maxlinelen=_HEADER_LINE_LENGTH).encode(linesep='\r\n')
+
+def _build_plain_message(headers: List[Tuple[str, str]], body: str) -> bytes:
+    """Assemble a single-part text/plain RFC 5322 message directly as bytes.
+
+    Produces the same structure MIMEText(body, 'plain') would (7bit us-ascii,
+    or base64 utf-8 for non-ASCII or over-long lines) without building and
+    flattening an email.message tree.
+
+    Args:
+        headers: (name, value) pairs, in order, e.g. [('To', ...), ('Subject', ...)].
+        body: Plain text body.
+
+    Returns:
+        The raw message bytes, with CRLF line endings.
+    """
+    # A trailing newline leaves an empty last item, so the joined payload keeps it
+    body_lines = _LINE_BREAK_PATTERN.split(body)
+    if body.isascii() and all(len(line) <= _MAX_LINE_LENGTH for line in body_lines):
+        charset, transfer_encoding = 'us-ascii', '7bit'
+        payload = '\r\n'.join(body_lines)
+    else:
+        charset, transfer_encoding = 'utf-8', 'base64'
+        payload = base64.encodebytes(body.encode('utf-8')).decode('ascii').replace('\n', '\r\n')
+
+    lines = [f"{name}: {_encode_header_value(name, value)}" for name, value in headers]
+    lines.append('MIME-Version: 1.0')
+    lines.append(f'Content-Type: text/plain; charset="{charset}"')
+    lines.append(f'Content-Transfer-Encoding: {transfer_encoding}')
+    return ('\r\n'.join(lines) + '\r\n\r\n' + payload).encode('ascii')
+
+def _extract_headers(payload: Dict[str, Any], wanted: Optional[FrozenSet[str]] = None) -> Dict[str, str]:
+    """Map a message payload's headers by lowercased name (helper function).
+
+    Args:
+        payload: Message payload from Gmail API
+        wanted: Optional. Lowercase names of the only headers to keep.
+
+    Returns:
+        Header values keyed by lowercase header name; later duplicates win.
+    """
+    headers = payload.get('headers', ())
+    if wanted is None:
+        return {header['name'].lower(): header['value'] for header in headers}
+    return {name: header['value'] for header in headers if (name := header['name'].lower()) in wanted}
+
+# Headers get_message returns; a full-format message carries dozens of others (Received, DKIM, ...)
+_GET_MESSAGE_HEADERS = frozenset({'from', 'to', 'cc', 'subject', 'date'})
+
+# Matches the charset parameter of a Content-Type header value
+_CHARSET_PATTERN = re.compile(r'charset\s*=\s*"?([^";\s]+)', re.IGNORECASE)
+
+def _part_charset(part: Dict[str, Any]) -> str:
+    """Return the charset declared in a part's Content-Type header, defaulting to utf-8."""
+    for header in part.get('headers', ()):
+        if header['name'].lower() == 'content-type':
+            match = _CHARSET_PATTERN.search(header['value'])
+            if match:
+                return match.group(1)
+            break
+    return 'utf-8'
+
+def _decode_body_data(body_data: str, charset: str = 'utf-8') -> str:
+    """Decode one part's base64url body data to text (helper function).
+
+    Args:
+        body_data: The part's body.data value from Gmail API
+        charset: The part's declared charset; undecodable bytes are replaced
+
+    Returns:
+        Decoded text, or a placeholder if the data is not valid base64
+    """
+    # Pad the base64 string if necessary
+    body_data += '=' * (-len(body_data) & 3)
+    try:
+        body_bytes = _b64url_decode(body_data)
+    except Exception as decode_error:
+         logger.error(f"Error decoding base64 body data: {decode_error}")
+         return "[Decoding Error]" # Return placeholder on error
+    try:
+        return body_bytes.decode(charset, errors='replace')
+    except LookupError:
+        logger.warning(f"Unknown charset '{charset}', decoding body as utf-8")
+        return body_bytes.decode('utf-8', errors='replace')
+
 def _get_message_body(payload: Dict[str, Any]) -> str:
     """Extract the message body from the payload (helper function).
 
+    Walks the MIME tree depth-first with an explicit stack, collecting the
+    encoded data of text/plain and text/html parts in document order. Only
+    the parts that are returned get decoded, so HTML alternatives are
+    skipped whenever plain text exists.
+
     Args:
         payload: Message payload from Gmail API
 
     Returns:
         Decoded message body as text
     """
-    # Handle base64 encoded body data
-    if 'body' in payload and payload['body'].get('data'):
-        body_data = payload['body']['data']
-        # Pad the base64 string if necessary
-        missing_padding = len(body_data) % 4
-        if missing_padding:
-            body_data += '=' * (4 - missing_padding)
-        try:
-            body_bytes = base64.urlsafe_b64decode(body_data)
-            # Try decoding with utf-8 first, fallback to common encodings if needed
-            try:
-                return body_bytes.decode('utf-8')
-            except UnicodeDecodeError:
-                logger.warning("Failed to decode body with utf-8, trying latin-1")
-                try:
-                    return body_bytes.decode('latin-1')
-                except UnicodeDecodeError:
-                     logger.warning("Failed to decode body with latin-1, trying iso-8859-1")
-                     return body_bytes.decode('iso-8859-1', errors='replace') # Replace errors as last resort
-        except Exception as decode_error:
-             logger.error(f"Error decoding base64 body data: {decode_error}")
-             return "[Decoding Error]" # Return placeholder on error
-
-    # Handle multipart messages
-    if 'parts' in payload:
-        text_parts = []
-        html_parts = []
-        for part in payload['parts']:
-            mime_type = part.get('mimeType', '')
-            if mime_type == 'text/plain':
-                part_body = _get_message_body(part)
-                if part_body: text_parts.append(part_body)
-            elif mime_type == 'text/html':
-                 part_body = _get_message_body(part)
-                 if part_body: html_parts.append(part_body)
-            # Handle nested multipart (e.g., multipart/alternative)
-            elif mime_type.startswith('multipart/'):
-                nested_body = _get_message_body(part) # Recursive call
-                if nested_body: text_parts.append(nested_body) # Add whatever is found inside
-
-        # Prefer plain text, fallback to HTML, then join whatever was found
-        if text_parts:
-            return '\n---\n'.join(text_parts)
-        elif html_parts:
-             # TODO: Consider adding HTML parsing/stripping library like BeautifulSoup
-             logger.debug("Returning HTML body as plain text was not available.")
-             return '\n---\n'.join(html_parts)
+    # Handle a single-part body
+    if payload.get('body', {}).get('data'):
+        return _decode_body_data(payload['body']['data'], _part_charset(payload))
+
+    text_data = []
+    html_data = []
+    collected_by_type = {'text/plain': text_data, 'text/html': html_data}
+    stack = list(reversed(payload.get('parts', ())))
+    while stack:
+        part = stack.pop()
+        mime_type = part.get('mimeType', '')
+        collected = collected_by_type.get(mime_type)
+        if collected is not None:
+            body_data = part.get('body', {}).get('data')
+            if body_data:
+                collected.append((body_data, _part_charset(part)))
+        # Descend into nested multipart (e.g., multipart/alternative)
+        elif mime_type.startswith('multipart/'):
+            stack.extend(reversed(part.get('parts', ())))
+
+    # Prefer plain text, fallback to HTML, then join whatever was found
+    text_parts = [body for body in itertools.starmap(_decode_body_data, text_data) if body]
+    if text_parts:
+        return '\n---\n'.join(text_parts)
+    html_parts = [body for body in itertools.starmap(_decode_body_data, html_data) if body]
+    if html_parts:
+         # TODO: Consider adding HTML parsing/stripping library like BeautifulSoup
+         logger.debug("Returning HTML body as plain text was not available.")
+         return '\n---\n'.join(html_parts)
 
     return "" # No readable body found
 
 
+# filename= and RFC 2231 filename*= parameters of a Content-Disposition header
+_FILENAME_PARAM_PATTERN = re.compile(r'(?<![\w-])filename(\*)?\s*=\s*(?:"([^"]*)"|([^;\s]+))', re.IGNORECASE)
+
+def _content_disposition_filename(content_disposition: str) -> Optional[str]:
+    """Get the filename parameter from a Content-Disposition value (helper function).
+
+    An RFC 2231 filename*= parameter (e.g. filename*=UTF-8''na%C3%AFve.txt)
+    takes precedence over a plain filename=.
+
+    Args:
+        content_disposition: The Content-Disposition header value
+
+    Returns:
+        The decoded filename, or None if the header has none
+    """
+    filename = None
+    for match in _FILENAME_PARAM_PATTERN.finditer(content_disposition):
+        extended, quoted, token = match.groups()
+        value = quoted if quoted is not None else token
+        if extended:
+            charset, _, encoded = email.utils.decode_rfc2231(value)
+            try:
+                return urllib.parse.unquote(encoded, encoding=charset or 'utf-8', errors='replace')
+            except LookupError:
+                return urllib.parse.unquote(encoded, errors='replace')
+        filename = filename or value
+    return filename
+
 def _extract_attachment_info(part: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """Extracts attachment information from a message part.
 
@@ -88,15 +238,13 @@ def _extract_attachment_info(part: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         otherwise None.
     """
     filename = part.get('filename')
-    content_disposition_header = next((header['value'] for header in part.get('headers', []) if header['name'].lower() == 'content-disposition'), None)
-
-    if not filename and content_disposition_header:
-        # Try to parse filename from Content-Disposition header
+    if not filename:
+        # Gmail usually fills in 'filename'; otherwise try the Content-Disposition header
         # Example: "attachment; filename=\"example.txt\""
-        if 'filename=' in content_disposition_header:
-            filename_parts = content_disposition_header.split('filename=')
-            if len(filename_parts) > 1:
-                filename = filename_parts[1].strip('" ') # Strip quotes and spaces
+        for header in part.get('headers', ()):
+            if header['name'].lower() == 'content-disposition':
+                filename = _content_disposition_filename(header['value'])
+                break
 
     if filename: # A part is considered an attachment if it has a filename
         attachment_id = part.get('body', {}).get('attachmentId')
@@ -117,6 +265,98 @@ def _extract_attachment_info(part: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         }
     return None
 
+# The only headers list_messages reads; Gmail omits all others from the response
+LIST_MESSAGE_HEADERS = ('From', 'To', 'Subject', 'Date')
+
+def _summarize_message(msg: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the simplified message object used in message listings (helper function).
+
+    Args:
+        msg: Message resource from Gmail API (metadata format is enough)
+
+    Returns:
+        Dictionary with id, threadId, snippet, from, to, subject, date, labels and read.
+    """
+    headers = _extract_headers(msg.get('payload', {}))
+    labels = msg.get('labelIds', [])
+    return {
+        'id': msg['id'],
+        'threadId': msg['threadId'],
+        'snippet': msg.get('snippet', ''),
+        'from': headers.get('from', ''),
+        'to': headers.get('to', ''),
+        'subject': headers.get('subject', ''),
+        'date': headers.get('date', ''),
+        'labels': labels,
+        'read': 'UNREAD' not in labels
+    }
+
+# Message IDs requested per list page; one page of details fits in one batch request
+LIST_PAGE_SIZE = GMAIL_BATCH_LIMIT
+
+def iter_messages(service: Resource, max_results: int = 10, query: str = "") -> Iterator[Dict[str, Any]]:
+    """Iterate over messages matching a query, one page at a time.
+
+    Message IDs are listed LIST_PAGE_SIZE at a time, following page tokens,
+    and each page's details are fetched in one batch request before its
+    messages are yielded. The first results are available after two round
+    trips, however many messages are requested.
+
+    Args:
+        service: Authorized Google API service instance.
+        max_results: Maximum number of messages to yield
+        query: Gmail search query (e.g., "is:unread", "from:example@gmail.com")
+
+    Yields:
+        Message dictionaries with id, snippet, headers, etc. Messages whose
+        details cannot be fetched are skipped; listing stops on error.
+    """
+    messages_resource = user_resource(service, 'messages')
+    remaining = max_results
+    page_token = None
+    try:
+        while remaining > 0:
+            # Get the next page of message IDs matching the query
+            list_args = {'userId': 'me', 'maxResults': min(remaining, LIST_PAGE_SIZE), 'q': query}
+            if page_token:
+                list_args['pageToken'] = page_token
+            results = messages_resource.list(**list_args).execute()
+            messages_summary = results.get('messages', [])[:remaining]
+            if not messages_summary:
+                return
+
+            page = []
+
+            def _on_message(message_id: str, msg: Optional[Dict[str, Any]], error: Optional[Exception]):
+                if error is not None:
+                    logger.error(f"Error fetching details for message {message_id}: {error}")
+                    return # Skip this message and continue with others
+                try:
+                    page.append(_summarize_message(msg))
+                except Exception as e:
+                     logger.error(f"Unexpected error fetching details for message {message_id}: {e}")
+                     # Skip this message
+
+            # Fetch details for the page's message IDs through the batch endpoint
+            requests = [
+                (message_summary['id'],
+                 messages_resource.get(
+                     userId='me', id=message_summary['id'], format='metadata', # Fetch metadata only for listing
+                     metadataHeaders=list(LIST_MESSAGE_HEADERS)
+                 ))
+                for message_summary in messages_summary
+            ]
+            execute_batch(service, requests, _on_message)
+            yield from page
+
+            remaining -= len(messages_summary)
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return
+
+    except Exception as e:
+        logger.error(f"Error listing messages: {e}")
+
 def list_messages(service: Resource, max_results: int = 10, query: str = "") -> List[Dict[str, Any]]:
     """List messages from Gmail.
 
@@ -128,107 +368,53 @@ def list_messages(service: Resource, max_results: int = 10, query: str = "") ->
     Returns:
         List of message dictionaries with id, snippet, headers, etc. or empty list on error.
     """
-    try:
-        # Get list of message IDs matching the query
-        results = service.users().messages().list(
-            userId='me', maxResults=max_results, q=query).execute()
-        messages_summary = results.get('messages', [])
-
-        if not messages_summary:
-            logger.info(f"No messages found for query: '{query}'")
-            return []
-
-        detailed_messages = []
-        # Fetch details for each message ID found
-        # Consider using batch requests for larger max_results if performance becomes an issue
-        for message_summary in messages_summary:
-            try:
-                msg = service.users().messages().get(
-                    userId='me', id=message_summary['id'], format='metadata' # Fetch metadata only for listing
-                ).execute()
-
-                # Extract headers
-                headers = {}
-                if 'payload' in msg and 'headers' in msg['payload']:
-                    for header in msg['payload']['headers']:
-                        headers[header['name'].lower()] = header['value']
-
-                # Create a simplified message object for the list
-                detailed_message = {
-                    'id': msg['id'],
-                    'threadId': msg['threadId'],
-                    'snippet': msg.get('snippet', ''),
-                    'from': headers.get('from', ''),
-                    'to': headers.get('to', ''),
-                    'subject': headers.get('subject', ''),
-                    'date': headers.get('date', ''),
-                    'labels': msg.get('labelIds', []),
-                    'read': 'UNREAD' not in msg.get('labelIds', [])
-                }
-                detailed_messages.append(detailed_message)
-
-            except googleapiclient.errors.HttpError as e:
-                 logger.error(f"Error fetching details for message {message_summary['id']}: {e}")
-                 # Skip this message and continue with others
-            except Exception as e:
-                 logger.error(f"Unexpected error fetching details for message {message_summary['id']}: {e}")
-                 # Skip this message
-
+    detailed_messages = list(iter_messages(service, max_results, query))
+    if detailed_messages:
         logger.info(f"Successfully listed {len(detailed_messages)} messages for query: '{query}'")
-        return detailed_messages
+    else:
+        logger.info(f"No messages found for query: '{query}'")
+    return detailed_messages
 
-    except Exception as e:
-        logger.error(f"Error listing messages: {e}")
-        return []
-
-def get_message(service: Resource, message_id: str) -> Optional[Dict[str, Any]]:
+def get_message(service: Resource, message_id: str, include_body: bool = True) -> Optional[Dict[str, Any]]:
     """Get a specific message with its full content.
 
     Args:
         service: Authorized Google API service instance.
         message_id: The ID of the message to retrieve
+        include_body: Whether to decode the message body. Callers that only need
+                      headers or attachments can pass False to skip walking and
+                      base64-decoding the body parts.
 
     Returns:
         Message dictionary with full content, including attachments, or None if not found or on error.
-        The 'attachments' key will hold a list of attachment details.
+        The 'attachments' key will hold a list of attachment details. 'body' is None
+        when include_body is False.
     """
     try:
         # Get the full message content
-        msg = service.users().messages().get(
+        msg = user_resource(service, 'messages').get(
             userId='me', id=message_id, format='full').execute() # format='full' gets payload with body
 
-        # Extract headers
-        headers = {}
-        if 'payload' in msg and 'headers' in msg['payload']:
-             for header in msg['payload']['headers']:
-                 headers[header['name'].lower()] = header['value']
+        payload = msg['payload']
+        headers = _extract_headers(payload, _GET_MESSAGE_HEADERS)
+        labels = msg.get('labelIds', [])
 
         # Extract body content using the helper function
-        body = _get_message_body(msg['payload'])
+        body = _get_message_body(payload) if include_body else None
 
-        # Extract attachment information
+        # Extract attachment information, walking nested parts depth-first in document order
         attachments_info = []
-        
-        def _process_parts(parts: List[Dict[str, Any]]):
-            """Helper to recursively process message parts for attachments."""
-            if not parts:
-                return
-            for part in parts:
-                attachment_detail = _extract_attachment_info(part)
-                if attachment_detail:
-                    attachments_info.append(attachment_detail)
-                
-                # Recursively process nested parts
-                if 'parts' in part:
-                    _process_parts(part['parts'])
-
-        if 'payload' in msg and 'parts' in msg['payload']:
-            _process_parts(msg['payload']['parts'])
-        elif 'payload' in msg: # Handle cases where the payload itself might be an attachment (e.g. simple EML attachment)
-            attachment_detail = _extract_attachment_info(msg['payload'])
+        if 'parts' in payload:
+            stack = list(reversed(payload['parts']))
+        else: # Handle cases where the payload itself might be an attachment (e.g. simple EML attachment)
+            stack = [payload]
+        while stack:
+            part = stack.pop()
+            attachment_detail = _extract_attachment_info(part)
             if attachment_detail:
                 attachments_info.append(attachment_detail)
-
+            if 'parts' in part:
+                stack.extend(reversed(part['parts']))
 
         # Create a detailed message object
         detailed_message = {
@@ -239,8 +425,8 @@ def get_message(service: Resource, message_id: str) -> Optional[Dict[str, Any]]:
             'cc': headers.get('cc', ''),
             'subject': headers.get('subject', ''),
             'date': headers.get('date', ''),
-            'labels': msg.get('labelIds', []),
-            'read': 'UNREAD' not in msg.get('labelIds', []),
+            'labels': labels,
+            'read': 'UNREAD' not in labels,
             'body': body,
             'attachments': attachments_info, # Add attachments here
             'snippet': msg.get('snippet', ''), # Include snippet too
@@ -260,62 +446,123 @@ def get_message(service: Resource, message_id: str) -> Optional[Dict[str, Any]]:
         logger.error(f"Unexpected error getting message {message_id}: {e}")
         return None
 
-def send_message(service: Resource, to: str, subject: str, body: str, attachments: Optional[List[str]] = None) -> Optional[str]:
-    """Send a new email, optionally with attachments.
+def get_message_state(service: Resource, message_id: str) -> Optional[Dict[str, Any]]:
+    """Get a message's current labels and historyId without its content.
 
     Args:
         service: Authorized Google API service instance.
+        message_id: The ID of the message to check
+
+    Returns:
+        Dictionary with 'labelIds' and 'historyId', or None if not found or on error.
+    """
+    try:
+        msg = user_resource(service, 'messages').get(
+            userId='me', id=message_id, format='minimal', fields='labelIds,historyId').execute()
+        return {'labelIds': msg.get('labelIds', []), 'historyId': msg.get('historyId', '')}
+    except googleapiclient.errors.HttpError as e:
+        if e.resp.status == 404:
+            logger.warning(f"Message with ID {message_id} not found.")
+        else:
+            logger.error(f"Error getting state of message {message_id}: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Unexpected error getting state of message {message_id}: {e}")
+        return None
+
+# Attachment bytes read per chunk; a multiple of 57, so every chunk encodes to whole 76-character lines
+_ATTACHMENT_CHUNK_SIZE = 57 * 1024
+
+def _encode_attachment(fp: BinaryIO) -> str:
+    """Base64-encode an open binary file as MIME body lines (helper function).
+
+    The file is read and encoded chunk by chunk, so its raw contents are never
+    held in memory all at once.
+
+    Args:
+        fp: File opened in binary mode.
+
+    Returns:
+        The encoded contents, in lines of 76 characters.
+    """
+    encoded = bytearray()
+    for chunk in iter(functools.partial(fp.read, _ATTACHMENT_CHUNK_SIZE), b''):
+        encoded += _base64_codec.encodebytes(chunk)
+    return encoded.decode('ascii')
+
+def _build_multipart_message(to: str, subject: str, body: str, attachments: List[str]) -> bytes:
+    """Build a multipart message with a plain text body and file attachments (helper function).
+
+    Files that cannot be read are logged and skipped.
+
+    Args:
         to: Recipient email address.
         subject: Email subject.
         body: Email body content (plain text).
-        attachments: Optional. A list of file paths for files to be attached.
+        attachments: File paths for files to be attached.
 
     Returns:
-        Message ID if successful, None otherwise.
+        The raw message bytes.
     """
-    try:
-        message = MIMEMultipart()
-        message['to'] = to
-        message['subject'] = subject
+    message = MIMEMultipart()
+    message['to'] = to
+    message['subject'] = subject
 
-        # Attach the body as plain text
-        message.attach(MIMEText(body, 'plain'))
+    # Attach the body as plain text
+    message.attach(MIMEText(body, 'plain'))
 
-        # Handle attachments if provided
-        if attachments:
-            for file_path in attachments:
-                try:
-                    logger.info(f"Attempting to attach file: {file_path}")
-                    content_type, encoding = mimetypes.guess_type(file_path)
+    for file_path in attachments:
+        try:
+            logger.info(f"Attempting to attach file: {file_path}")
+            content_type, encoding = mimetypes.guess_type(file_path)
 
-                    if content_type is None or encoding is not None: # If encoding is not None, it's likely a text type guessed by mimetypes
-                        content_type = 'application/octet-stream' # Default for unknown or encoded types
+            if content_type is None or encoding is not None: # If encoding is not None, it's likely a text type guessed by mimetypes
+                content_type = 'application/octet-stream' # Default for unknown or encoded types
 
-                    main_type, sub_type = content_type.split('/', 1)
+            main_type, sub_type = content_type.split('/', 1)
 
-                    with open(file_path, 'rb') as fp:
-                        file_data = fp.read()
+            part = MIMEBase(main_type, sub_type)
+            with open(file_path, 'rb') as fp:
+                part.set_payload(_encode_attachment(fp))
+            part['Content-Transfer-Encoding'] = 'base64'
 
-                    part = MIMEBase(main_type, sub_type)
-                    part.set_payload(file_data)
-                    encode_base64(part) # Encode the payload
+            # Add Content-Disposition header
+            part.add_header('Content-Disposition', 'attachment', filename=os.path.basename(file_path))
+            message.attach(part)
+            logger.info(f"Successfully attached file: {file_path}")
 
-                    # Add Content-Disposition header
-                    part.add_header('Content-Disposition', 'attachment', filename=os.path.basename(file_path))
-                    message.attach(part)
-                    logger.info(f"Successfully attached file: {file_path}")
+        except FileNotFoundError:
+            logger.error(f"Attachment file not found: {file_path}. Skipping this attachment.")
+        except Exception as e:
+            logger.error(f"Error attaching file {file_path}: {e}. Skipping this attachment.")
 
-                except FileNotFoundError:
-                    logger.error(f"Attachment file not found: {file_path}. Skipping this attachment.")
-                except Exception as e:
-                    logger.error(f"Error attaching file {file_path}: {e}. Skipping this attachment.")
+    return message.as_bytes()
+
+def send_message(service: Resource, to: str, subject: str, body: str, attachments: Optional[List[str]] = None) -> Optional[str]:
+    """Send a new email, optionally with attachments.
+
+    Args:
+        service: Authorized Google API service instance.
+        to: Recipient email address.
+        subject: Email subject.
+        body: Email body content (plain text).
+        attachments: Optional. A list of file paths for files to be attached.
+
+    Returns:
+        Message ID if successful, None otherwise.
+    """
+    try:
+        if not attachments:
+            # Plain text only: assemble the raw message directly
+            raw_message_bytes = _build_plain_message([('To', to), ('Subject', subject)], body)
+        else:
+            raw_message_bytes = _build_multipart_message(to, subject, body, attachments)
 
         # Encode the message for the API
-        raw_message_bytes = message.as_bytes()
-        raw_message = base64.urlsafe_b64encode(raw_message_bytes).decode('utf-8')
+        raw_message = _b64url_encode(raw_message_bytes).decode('ascii')
 
         message_body = {'raw': raw_message}
-        sent_message = service.users().messages().send(userId='me', body=message_body).execute()
+        sent_message = user_resource(service, 'messages').send(userId='me', body=message_body).execute()
 
         num_attachments = len(attachments) if attachments else 0
         logger.info(f"Message sent successfully to {to} with {num_attachments} attachments. ID: {sent_message['id']}")
@@ -328,31 +575,40 @@ def send_message(service: Resource, to: str, subject: str, body: str, attachment
         logger.error(f"Unexpected error sending message to {to}: {e}")
         return None
 
-def reply_to_message(service: Resource, message_id: str, body: str) -> Optional[str]:
+# The only headers reply_to_message reads from the original message
+REPLY_HEADERS = ('Subject', 'From', 'To', 'Cc', 'Reply-To', 'Message-ID', 'References')
+
+def reply_to_message(service: Resource, message_id: str, body: str,
+                     original_headers: Optional[Dict[str, str]] = None,
+                     thread_id: Optional[str] = None) -> Optional[str]:
     """Reply to an existing email.
 
     Args:
         service: Authorized Google API service instance.
         message_id: ID of the email to reply to
         body: Reply content (plain text)
+        original_headers: Optional. The original's REPLY_HEADERS, keyed by lowercase
+                          name, for callers that already have them.
+        thread_id: Optional. The original's thread ID. When given together with
+                   original_headers, the original message is not fetched.
 
     Returns:
         Message ID of the reply if successful, None otherwise
     """
     try:
-        # Get the original message metadata to extract necessary headers and thread ID
-        original = service.users().messages().get(
-            userId='me', id=message_id, format='metadata' # Only need headers and threadId
-        ).execute()
+        if original_headers is not None and thread_id:
+            headers = original_headers
+        else:
+            # Get the original message metadata to extract necessary headers and thread ID
+            original = user_resource(service, 'messages').get(
+                userId='me', id=message_id, format='metadata', # Only need headers and threadId
+                metadataHeaders=list(REPLY_HEADERS)
+            ).execute()
 
-        thread_id = original['threadId']
+            thread_id = original['threadId']
 
-        # Extract essential headers from the original message
-        headers = {}
-        if 'payload' in original and 'headers' in original['payload']:
-            for header in original['payload']['headers']:
-                 # Normalize header names to lowercase for reliable access
-                 headers[header['name'].lower()] = header['value']
+            # Extract essential headers from the original message
+            headers = _extract_headers(original.get('payload', {}))
 
         original_subject = headers.get('subject', '')
         original_from = headers.get('from', '')
@@ -364,9 +620,8 @@ def reply_to_message(service: Resource, message_id: str, body: str) -> Optional[
         # Determine recipient(s) for the reply
         reply_to = headers.get('reply-to', original_from) # Prefer Reply-To if present
 
-        # Create the reply MIME message
-        message = MIMEMultipart()
-        message['to'] = reply_to
+        # Reply headers, in order
+        reply_headers = [('To', reply_to)]
         # Optionally add original recipients (To, CC) to CC if desired (common practice)
         # For simplicity, just replying to the sender/Reply-To address here.
 
@@ -375,31 +630,27 @@ def reply_to_message(service: Resource, message_id: str, body: str) -> Optional[
             subject = original_subject
         else:
             subject = f"Re: {original_subject}"
-        message['subject'] = subject
+        reply_headers.append(('Subject', subject))
 
         # Set In-Reply-To and References headers for proper email threading
         if original_message_id_header:
-            message['In-Reply-To'] = original_message_id_header
+            reply_headers.append(('In-Reply-To', original_message_id_header))
             references = original_references_header if original_references_header else ''
             if original_message_id_header not in references: # Avoid duplication
                  if references:
                      references += " " # Add space separator
                  references += original_message_id_header
-            message['References'] = references
+            reply_headers.append(('References', references))
         else:
              logger.warning(f"Original message {message_id} missing 'Message-ID' header. Threading may be affected.")
 
-
-        # Attach the reply body
-        message.attach(MIMEText(body, 'plain'))
-
-        # Encode the message
-        raw_message_bytes = message.as_bytes()
-        raw_message = base64.urlsafe_b64encode(raw_message_bytes).decode('utf-8')
+        # Assemble and encode the plain text reply
+        raw_message_bytes = _build_plain_message(reply_headers, body)
+        raw_message = _b64url_encode(raw_message_bytes).decode('ascii')
 
         # Send the reply, ensuring it's part of the original thread
         reply_body = {'raw': raw_message, 'threadId': thread_id}
-        sent_message = service.users().messages().send(
+        sent_message = user_resource(service, 'messages').send(
             userId='me', body=reply_body).execute()
 
         logger.info(f"Reply sent for message ID {message_id}. New message ID: {sent_message['id']}")
@@ -424,7 +675,7 @@ def delete_message(service: Resource, message_id: str) -> bool:
     """
     try:
         # Use the trash method to move the message to trash
-        service.users().messages().trash(
+        user_resource(service, 'messages').trash(
             userId='me', id=message_id).execute()
         logger.info(f"Successfully moved message ID {message_id} to trash.")
         return True
@@ -438,10 +689,16 @@ def delete_message(service: Resource, message_id: str) -> bool:
         logger.error(f"Unexpected error deleting message {message_id}: {e}")
         return False
 
+# Gmail accepts up to 1000 message IDs per batchModify call
+BATCH_MODIFY_LIMIT = 1000
+
 def batch_delete_messages(service: Resource, message_ids: List[str]) -> Dict[str, Any]:
     """Delete multiple email messages in a batch operation (moves to trash).
 
-    Note: Gmail API's batch trash endpoint simplifies this.
+    Messages are trashed by adding the TRASH label through batchModify, up to
+    1000 IDs per call. If batchModify fails for a chunk, that chunk is retried
+    with per-message trash() calls sent through the batch endpoint, so the
+    result still identifies which messages failed.
 
     Args:
         service: Authorized Google API service instance.
@@ -449,28 +706,72 @@ def batch_delete_messages(service: Resource, message_ids: List[str]) -> Dict[str
 
     Returns:
         Dictionary with counts of successful and failed deletions, and list of failed IDs.
-        Returns {"success": 0, "failed": len(message_ids), "failed_ids": message_ids} on initial API error.
     """
     if not message_ids:
         return {"success": 0, "failed": 0, "failed_ids": []}
 
-    try:
-        # Use the batchTrash method
-        request_body = {'ids': message_ids}
-        service.users().messages().batchTrash(userId='me', body=request_body).execute()
-        # If batchTrash succeeds, the API doesn't return per-message status, it's all or nothing for the call itself.
-        # Assume all succeeded if the call didn't raise an exception.
-        logger.info(f"Successfully executed batch trash for {len(message_ids)} messages.")
-        return {"success": len(message_ids), "failed": 0, "failed_ids": []}
-    except googleapiclient.errors.HttpError as e:
-         # Batch operations might return partial success/failure details in the error response,
-         # but parsing that can be complex. For simplicity, treat API error as full failure.
-         logger.error(f"Error during batch delete operation: {e}. Treating all as failed.")
-         return {"success": 0, "failed": len(message_ids), "failed_ids": message_ids}
-    except Exception as e:
-         logger.error(f"Unexpected error during batch delete: {e}")
-         return {"success": 0, "failed": len(message_ids), "failed_ids": message_ids}
+    trashed_ids = []
+    failed_ids = []
+
+    def _on_trash(message_id: str, response: Any, error: Optional[Exception]):
+        if error is not None:
+            logger.error(f"Error moving message {message_id} to trash: {error}")
+            failed_ids.append(message_id)
+        else:
+            trashed_ids.append(message_id)
+
+    for start in range(0, len(message_ids), BATCH_MODIFY_LIMIT):
+        chunk = message_ids[start:start + BATCH_MODIFY_LIMIT]
+        try:
+            request_body = {'ids': chunk, 'addLabelIds': ['TRASH'], 'removeLabelIds': []}
+            user_resource(service, 'messages').batchModify(userId='me', body=request_body).execute()
+            # batchModify returns no per-message status; the call succeeds or fails as a whole.
+            trashed_ids.extend(chunk)
+        except googleapiclient.errors.HttpError as e:
+            logger.warning(f"batchModify failed for {len(chunk)} messages: {e}. Trashing them individually.")
+            try:
+                requests = [(message_id, user_resource(service, 'messages').trash(userId='me', id=message_id))
+                            for message_id in chunk]
+                execute_batch(service, requests, _on_trash)
+            except Exception as fallback_error:
+                logger.error(f"Unexpected error trashing messages individually: {fallback_error}")
+                answered = set(trashed_ids) | set(failed_ids)
+                failed_ids.extend(message_id for message_id in chunk if message_id not in answered)
+        except Exception as e:
+             logger.error(f"Unexpected error during batch delete: {e}")
+             failed_ids.extend(chunk)
+
+    logger.info(f"Batch delete finished: {len(trashed_ids)} messages moved to trash, {len(failed_ids)} failed.")
+    return {"success": len(trashed_ids), "failed": len(failed_ids), "failed_ids": failed_ids}
+
+
+# Label IDs Gmail can return: user labels are Label_<n>, system labels are fixed upper-case names
+_LABEL_ID_PATTERN = re.compile(r'Label_\d+|INBOX|UNREAD|STARRED|SPAM|TRASH|DRAFT|SENT|IMPORTANT|CHAT|CATEGORY_[A-Z]+')
 
+def _is_valid_label_change(add_label_ids: Optional[List[str]], remove_label_ids: Optional[List[str]]) -> bool:
+    """Check a label change before sending it (helper function).
+
+    Gmail rejects unknown label IDs (a common mistake is passing label names)
+    with a 400 for the whole request, so such changes are refused up front.
+
+    Args:
+        add_label_ids: List of label IDs to add.
+        remove_label_ids: List of label IDs to remove.
+
+    Returns:
+        True if the change is worth sending, False if it is invalid or a no-op.
+    """
+    add_label_ids = add_label_ids or []
+    remove_label_ids = remove_label_ids or []
+    invalid_ids = [label_id for label_id in itertools.chain(add_label_ids, remove_label_ids)
+                   if not _LABEL_ID_PATTERN.fullmatch(label_id)]
+    if invalid_ids:
+        logger.error(f"Invalid label IDs {invalid_ids}. Use IDs from list_labels (e.g. 'Label_1', 'INBOX'), not label names.")
+        return False
+    if set(add_label_ids) == set(remove_label_ids):
+        logger.warning("Labels to add and remove are the same; nothing to change.")
+        return False
+    return True
 
 def modify_message_labels(service: Resource, message_id: str,
                           add_label_ids: Optional[List[str]] = None,
@@ -491,6 +792,8 @@ def modify_message_labels(service: Resource, message_id: str,
          # To be consistent, perhaps fetch and return the current message state?
          # Or just return None as no modification was requested/performed.
          return None # Return None as no action taken
+    if not _is_valid_label_change(add_label_ids, remove_label_ids):
+        return None
 
     modify_request = {
         # Ensure lists are provided even if None was passed
@@ -499,7 +802,7 @@ def modify_message_labels(service: Resource, message_id: str,
     }
 
     try:
-        updated_message = service.users().messages().modify(
+        updated_message = user_resource(service, 'messages').modify(
             userId='me', id=message_id, body=modify_request).execute()
 
         log_parts = []
@@ -523,6 +826,70 @@ def modify_message_labels(service: Resource, message_id: str,
         return None
 
 
+def batch_modify_message_labels(service: Resource, message_ids: List[str],
+                                add_label_ids: Optional[List[str]] = None,
+                                remove_label_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Add or remove labels on multiple messages in a batch operation.
+
+    Uses batchModify, up to 1000 IDs per call. If batchModify fails for a
+    chunk, that chunk is retried with per-message modify() calls sent through
+    the batch endpoint, so the result still identifies which messages failed.
+
+    Args:
+        service: Authorized Google API service instance.
+        message_ids: List of message IDs to modify.
+        add_label_ids: List of label IDs to add.
+        remove_label_ids: List of label IDs to remove.
+
+    Returns:
+        Dictionary with counts of successful and failed modifications, and list of failed IDs.
+    """
+    if not message_ids or (not add_label_ids and not remove_label_ids):
+        if message_ids:
+            logger.warning("No labels provided to add or remove.")
+        return {"success": 0, "failed": 0, "failed_ids": []}
+    if not _is_valid_label_change(add_label_ids, remove_label_ids):
+        return {"success": 0, "failed": len(message_ids), "failed_ids": list(message_ids)}
+
+    modify_request = {
+        'addLabelIds': add_label_ids if add_label_ids else [],
+        'removeLabelIds': remove_label_ids if remove_label_ids else []
+    }
+    modified_ids = []
+    failed_ids = []
+
+    def _on_modify(message_id: str, response: Any, error: Optional[Exception]):
+        if error is not None:
+            logger.error(f"Error modifying labels for message {message_id}: {error}")
+            failed_ids.append(message_id)
+        else:
+            modified_ids.append(message_id)
+
+    for start in range(0, len(message_ids), BATCH_MODIFY_LIMIT):
+        chunk = message_ids[start:start + BATCH_MODIFY_LIMIT]
+        try:
+            user_resource(service, 'messages').batchModify(
+                userId='me', body={'ids': chunk, **modify_request}).execute()
+            # batchModify returns no per-message status; the call succeeds or fails as a whole.
+            modified_ids.extend(chunk)
+        except googleapiclient.errors.HttpError as e:
+            logger.warning(f"batchModify failed for {len(chunk)} messages: {e}. Modifying them individually.")
+            try:
+                requests = [(message_id, user_resource(service, 'messages').modify(
+                                userId='me', id=message_id, body=modify_request))
+                            for message_id in chunk]
+                execute_batch(service, requests, _on_modify)
+            except Exception as fallback_error:
+                logger.error(f"Unexpected error modifying messages individually: {fallback_error}")
+                answered = set(modified_ids) | set(failed_ids)
+                failed_ids.extend(message_id for message_id in chunk if message_id not in answered)
+        except Exception as e:
+             logger.error(f"Unexpected error during batch label modification: {e}")
+             failed_ids.extend(chunk)
+
+    logger.info(f"Batch label modification finished: {len(modified_ids)} messages modified, {len(failed_ids)} failed.")
+    return {"success": len(modified_ids), "failed": len(failed_ids), "failed_ids": failed_ids}
+
 def get_attachment_data(service: Resource, message_id: str, attachment_id: str) -> Optional[bytes]:
     """Fetches and decodes attachment data from a message.
 
@@ -535,7 +902,7 @@ def get_attachment_data(service: Resource, message_id: str, attachment_id: str)
         The decoded attachment data as bytes, or None if an error occurs.
     """
     try:
-        attachment_part = service.users().messages().attachments().get(
+        attachment_part = user_resource(service, 'messages').attachments().get(
             userId='me', messageId=message_id, id=attachment_id
         ).execute()
 
@@ -544,10 +911,10 @@ def get_attachment_data(service: Resource, message_id: str, attachment_id: str)
             logger.error(f"No data found in attachment {attachment_id} for message {message_id}.")
             return None
 
-        # Base64url decode the data. Padding issues are less common with urlsafe_b64decode
-        # but it's good to be aware. The Gmail API typically provides correctly padded base64url.
+        # Base64url decode the data, padding it first in case the API left it unpadded.
+        # Attachments can be many megabytes, so this uses the same fast codec as message bodies.
         try:
-            decoded_data = base64.urlsafe_b64decode(data)
+            decoded_data = _b64url_decode(data + '=' * (-len(data) & 3))
             logger.info(f"Successfully fetched and decoded attachment {attachment_id} from message {message_id}.")
             return decoded_data
         except Exception as decode_error: # Catch potential errors during decoding
@@ -0,0 +1,35 @@
+"""
+Gmail API Resource Accessors
+"""
+
+import threading
+import weakref
+from typing import Dict
+
+from googleapiclient.discovery import Resource # For type hinting the service object
+
+# Child resources already built for each service, e.g. {'messages': <Resource>}.
+# Entries disappear together with their service.
+_USER_RESOURCES: "weakref.WeakKeyDictionary[Resource, Dict[str, Resource]]" = weakref.WeakKeyDictionary()
+_USER_RESOURCES_LOCK = threading.Lock()
+
+def user_resource(service: Resource, name: str) -> Resource:
+    """Return service.users().<name>(), building it only once per service.
+
+    Each service.users().messages() call walks the discovery document and
+    creates fresh Resource objects. The built resources are stateless apart
+    from the service's own HTTP client, so they can be reused for every call.
+
+    Args:
+        service: Authorized Google API service instance.
+        name: Name of the users collection, e.g. 'messages', 'labels' or 'drafts'.
+
+    Returns:
+        The collection's Resource.
+    """
+    with _USER_RESOURCES_LOCK:
+        resources = _USER_RESOURCES.setdefault(service, {})
+        resource = resources.get(name)
+        if resource is None:
+            resource = resources[name] = getattr(service.users(), name)()
+        return resource
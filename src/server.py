@@ -3,12 +3,16 @@
 Gmail MCP Server - Provides Gmail functionality through the Model Context Protocol
 """
 
+import base64
+import binascii
 import os
 import json
 import logging
 import socket
+import sys
+import threading
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Mapping, Optional
 from dotenv import load_dotenv
 
 # Import MCP SDK
@@ -30,24 +34,66 @@ mcp = FastMCP("gmail")
 # Initialize Gmail API client
 CREDENTIALS_FILE = os.getenv('CREDENTIALS_FILE', 'credentials.json')
 TOKEN_FILE = os.getenv('TOKEN_FILE', 'token.json')
+MESSAGE_STORE_FILE = os.getenv('MESSAGE_STORE_FILE') or None # Optional on-disk message cache
 SERVER_HOST = os.getenv('SERVER_HOST', '0.0.0.0')
 PREFERRED_PORT = int(os.getenv('SERVER_PORT', '8000'))
 SERVER_PATH = os.getenv('SERVER_PATH', '/mcp')
 
-# Initialize Gmail API (now the client facade)
-gmail_client = GmailClient(CREDENTIALS_FILE, TOKEN_FILE)
+def _create_gmail_client() -> GmailClient:
+    """Create and authenticate the Gmail client facade.
 
-# Try to authenticate (authentication is now handled within GmailClient.__init__)
-if not os.path.exists(CREDENTIALS_FILE):
-    logger.error(f"Credentials file {CREDENTIALS_FILE} not found. Please set up your credentials.")
-    raise FileNotFoundError(f"Credentials file {CREDENTIALS_FILE} not found")
+    Raises:
+        FileNotFoundError: If the credentials file does not exist.
+        Exception: If authentication fails.
+    """
+    if not os.path.exists(CREDENTIALS_FILE):
+        logger.error(f"Credentials file {CREDENTIALS_FILE} not found. Please set up your credentials.")
+        raise FileNotFoundError(f"Credentials file {CREDENTIALS_FILE} not found")
+
+    # Authentication is handled within GmailClient.__init__
+    client = GmailClient(CREDENTIALS_FILE, TOKEN_FILE, message_store_file=MESSAGE_STORE_FILE)
+    if not client.authenticated:
+        logger.error("Gmail API authentication failed. Please check your credentials or logs.")
+        raise Exception("Gmail API authentication failed")
+
+    logger.info("Gmail API client initialized and authenticated successfully.")
+    return client
 
-# Check if the client authenticated successfully
-if not gmail_client.authenticated:
-    logger.error("Gmail API authentication failed. Please check your credentials or logs.")
-    raise Exception("Gmail API authentication failed")
+class _LazyGmailClient:
+    """Stands in for the GmailClient, creating it on first use.
+
+    Importing this module therefore reads no credentials and makes no network
+    calls; attribute access is forwarded to the real client once it exists.
+    """
 
-logger.info("Gmail API client initialized and authenticated successfully.")
+    def __init__(self):
+        self._client: Optional[GmailClient] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> GmailClient:
+        """Return the client, creating and authenticating it if needed."""
+        with self._lock:
+            if self._client is None:
+                self._client = _create_gmail_client()
+            return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        # Introspection (mock.patch, copy, ...) probes private and dunder names; don't authenticate for those
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+gmail_client = _LazyGmailClient()
+
+def _format_message_summary(message: Dict[str, Any]) -> str:
+    """Format one message from a listing as a text block ending in a separator."""
+    read_status = "Read" if message["read"] else "Unread"
+    return (f"ID: {message['id']}\n"
+            f"From: {message['from']}\n"
+            f"Subject: {message['subject']}\n"
+            f"Date: {message['date']}\n"
+            f"Status: {read_status}\n"
+            "---\n")
 
 # Tool implementations
 @mcp.tool()
@@ -68,18 +114,7 @@ async def list_emails(max_results: int = 10, label: str = "INBOX") -> str:
     if not messages:
         return f"No emails found with label '{label}'."
     
-    result = f"Found {len(messages)} emails with label '{label}':\n\n"
-    
-    for message in messages:
-        read_status = "Read" if message["read"] else "Unread"
-        result += f"ID: {message['id']}\n"
-        result += f"From: {message['from']}\n"
-        result += f"Subject: {message['subject']}\n"
-        result += f"Date: {message['date']}\n"
-        result += f"Status: {read_status}\n"
-        result += "---\n"
-    
-    return result
+    return f"Found {len(messages)} emails with label '{label}':\n\n" + "".join(map(_format_message_summary, messages))
 
 @mcp.tool()
 async def get_email(email_id: str) -> str:
@@ -97,17 +132,16 @@ async def get_email(email_id: str) -> str:
     if not message:
         return f"Email with ID '{email_id}' not found."
     
-    result = f"From: {message['from']}\n"
-    result += f"To: {message['to']}\n"
+    lines = [f"From: {message['from']}", f"To: {message['to']}"]
     if message.get('cc'):
-        result += f"CC: {message['cc']}\n"
-    result += f"Subject: {message['subject']}\n"
-    result += f"Date: {message['date']}\n"
-    result += f"Labels: {', '.join(message['labels'])}\n"
-    result += f"Status: {'Read' if message['read'] else 'Unread'}\n"
-    result += f"\n{message['body']}"
+        lines.append(f"CC: {message['cc']}")
+    lines.append(f"Subject: {message['subject']}")
+    lines.append(f"Date: {message['date']}")
+    lines.append(f"Labels: {', '.join(message['labels'])}")
+    lines.append(f"Status: {'Read' if message['read'] else 'Unread'}")
+    lines.append(f"\n{message['body']}")
     
-    return result
+    return "\n".join(lines)
 
 @mcp.tool()
 async def search_emails(query: str, max_results: int = 5) -> str:
@@ -126,18 +160,7 @@ async def search_emails(query: str, max_results: int = 5) -> str:
     if not messages:
         return f"No emails found matching query '{query}'."
     
-    result = f"Found {len(messages)} emails matching query '{query}':\n\n"
-    
-    for message in messages:
-        read_status = "Read" if message["read"] else "Unread"
-        result += f"ID: {message['id']}\n"
-        result += f"From: {message['from']}\n"
-        result += f"Subject: {message['subject']}\n"
-        result += f"Date: {message['date']}\n"
-        result += f"Status: {read_status}\n"
-        result += "---\n"
-    
-    return result
+    return f"Found {len(messages)} emails matching query '{query}':\n\n" + "".join(map(_format_message_summary, messages))
 
 @mcp.tool()
 async def send_email(to: str, subject: str, body: str) -> str:
@@ -363,6 +386,33 @@ async def remove_labels_from_email(email_id: str, label_ids: List[str]) -> str:
     else:
         return f"Failed to remove labels from email {email_id}. Check if the email ID and label IDs are valid. Check logs."
 
+@mcp.tool()
+async def modify_labels_for_emails(email_ids: List[str], add_label_ids: Optional[List[str]] = None,
+                                   remove_label_ids: Optional[List[str]] = None) -> str:
+    """Add and/or remove labels on multiple emails at once using label IDs.
+
+    Args:
+        email_ids: List of email IDs to modify.
+        add_label_ids: Optional. Label IDs to add to every email (e.g., ['Label_123', 'STARRED']).
+        remove_label_ids: Optional. Label IDs to remove from every email (e.g., ['UNREAD']).
+
+    Returns:
+        Confirmation message with results
+    """
+    if not email_ids:
+        return "You must provide at least one email ID."
+    if not add_label_ids and not remove_label_ids:
+        return "You must provide at least one label ID to add or remove."
+
+    results = gmail_client.batch_modify_message_labels(email_ids, add_label_ids, remove_label_ids)
+
+    if results["success"] > 0 and results["failed"] == 0:
+        return f"Labels updated on all {results['success']} emails."
+    elif results["success"] > 0 and results["failed"] > 0:
+        return f"Labels updated on {results['success']} emails. {results['failed']} emails failed: {', '.join(results['failed_ids'])}"
+    else:
+        return "Failed to update labels on any emails. Please check the logs for details."
+
 # --- Draft Management Tools ---
 
 @mcp.tool()
@@ -440,13 +490,7 @@ async def get_draft(draft_id: str) -> str:
             for part in payload['parts']:
                 if part.get('mimeType') == 'text/plain':
                     if 'data' in part['body']:
-                        body_content = gmail_client.service.users().messages().get( # Hacky, but body isn't directly in draft
-                            userId='me', id=message_data['id'], format='raw' 
-                        ).execute()['raw'] # This is not ideal as it re-fetches
-                        # A better way would be to decode from part['body']['data'] if available
-                        # but draft message parts often don't have 'data' directly, they are references
-                        # For simplicity, let's try to decode if data is present, else use snippet
-                        import base64
+                        # Decode the part's data directly; fall back to the snippet if that fails
                         try:
                             body_content = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8')
                             break
@@ -456,7 +500,6 @@ async def get_draft(draft_id: str) -> str:
                 body_content = message_data.get('snippet', 'Body not directly available, snippet shown.')
 
         elif 'body' in payload and 'data' in payload['body']:
-            import base64
             try:
                 body_content = base64.urlsafe_b64decode(payload['body']['data']).decode('utf-8')
             except (KeyError, TypeError, binascii.Error):
@@ -578,6 +621,55 @@ async def send_draft(draft_id: str) -> str:
         logger.error(f"Error in send_draft tool for ID {draft_id}: {e}")
         return f"An error occurred while sending draft {draft_id}: {e}"
 
+# --- Batch Tool ---
+
+# Tools batch_execute can call; @mcp.tool() may wrap a function in a tool object exposing it as .fn
+_BATCH_TOOLS = {fn.__name__: fn for fn in (getattr(tool, 'fn', tool) for tool in (
+    list_emails, get_email, search_emails, send_email, reply_to_email, delete_email, delete_emails,
+    list_gmail_labels, get_gmail_label, create_gmail_label, delete_gmail_label,
+    add_labels_to_email, remove_labels_from_email, modify_labels_for_emails,
+    list_drafts, get_draft, create_draft, update_draft, delete_draft, send_draft,
+))}
+
+@mcp.tool()
+async def batch_execute(calls: List[Dict[str, Any]], stop_on_error: bool = False) -> str:
+    """Run several of this server's tools in one request.
+
+    Calls run one after another, in order, as they share one Gmail client.
+
+    Args:
+        calls: Tool calls, each {"tool": "<tool name>", "args": {...}},
+               e.g. [{"tool": "get_email", "args": {"email_id": "abc"}}].
+        stop_on_error: Optional. Skip the remaining calls after one fails (default: False).
+
+    Returns:
+        The result of each call, in order
+    """
+    if not calls:
+        return "You must provide at least one tool call."
+
+    results = []
+    for index, call in enumerate(calls, 1):
+        tool_name = call.get('tool', '') if isinstance(call, dict) else ''
+        try:
+            tool = _BATCH_TOOLS.get(tool_name)
+            if tool is None:
+                raise ValueError(f"Unknown tool '{tool_name}'")
+            args = call.get('args') or {}
+            if not isinstance(args, Mapping):
+                raise ValueError(f"'args' must be an object of keyword arguments, not {type(args).__name__}")
+            output = await tool(**args)
+        except Exception as e:
+            logger.error(f"Error in batch_execute call {index} ({tool_name}): {e}")
+            results.append(f"[{index}] {tool_name}: Error: {e}")
+            if stop_on_error:
+                results.append(f"Stopped after call {index}; {len(calls) - index} remaining calls were not run.")
+                break
+        else:
+            results.append(f"[{index}] {tool_name}:\n{output}")
+
+    return "\n\n".join(results)
+
 def find_available_port(start_port: int, max_attempts: int = 10) -> int:
     """Find an available port starting from the given port.
     
@@ -590,6 +682,12 @@ def find_available_port(start_port: int, max_attempts: int = 10) -> int:
     """
     for port in range(start_port, start_port + max_attempts):
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            # Bind the way the server will (uvicorn sets SO_REUSEADDR), so a port left in
+            # TIME_WAIT by a server that just stopped is not mistaken for one in use.
+            # On Windows SO_REUSEADDR lets a socket bind a port another process is
+            # listening on, so the probe keeps exclusive binding semantics there.
+            if sys.platform != 'win32':
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             try:
                 s.bind((SERVER_HOST, port))
                 # If we get here, the port is available
@@ -602,6 +700,9 @@ def find_available_port(start_port: int, max_attempts: int = 10) -> int:
 # Run the server
 if __name__ == "__main__":
     logger.info("Starting Gmail MCP Server...")
+
+    # Authenticate before serving, so a missing or rejected credential stops startup
+    gmail_client.get()
     
     # Find an available port
     port = find_available_port(PREFERRED_PORT)
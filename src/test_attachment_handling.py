@@ -3,6 +3,7 @@ from unittest.mock import patch, mock_open, MagicMock, ANY
 import base64
 import os
 import mimetypes
+import threading
 from email import message_from_bytes
 
 # Modules to test
@@ -20,6 +21,9 @@ class TestAttachmentHandling(unittest.TestCase):
         self.mock_client = GmailClient(credentials_file="", token_file="") # Pass dummy paths, won't be used due to patch
         self.mock_client.service = MagicMock() # Set the mocked service directly
         self.mock_client.authenticated = True # Assume authenticated for client tests
+        self.mock_client._listings_cache = {}
+        self.mock_client._listings_cache_lock = threading.Lock()
+        self.mock_client._listings_generation = 0
 
         self.mock_service = self.mock_client.service # Keep this for tests that directly use service mock
 
@@ -47,6 +51,12 @@ class TestAttachmentHandling(unittest.TestCase):
         self.patch_builtin_open = patch('builtins.open', new_callable=mock_open)
         self.mock_builtin_open = self.patch_builtin_open.start()
 
+    def tearDown(self):
+        self.logger_patch.stop()
+        self.patch_os_path_exists.stop()
+        self.patch_os_makedirs.stop()
+        self.patch_builtin_open.stop()
+
     # --- Tests for src.messages._extract_attachment_info ---
     def test_extract_attachment_info_direct_filename(self):
         part = {
@@ -429,13 +439,11 @@ class TestAttachmentHandling(unittest.TestCase):
         raw_email_bytes = base64.urlsafe_b64decode(sent_body_arg['raw'])
         email_message = message_from_bytes(raw_email_bytes)
 
-        self.assertTrue(email_message.is_multipart()) # MIMEMultipart is used by default
-        # Even if no explicit attachments, MIMEMultipart might create a structure
-        # The key is that the body part is there, and no *file* attachments are.
-        # A simple text message in MIMEMultipart often has one part (the text body).
-        payload = email_message.get_payload()
-        self.assertEqual(len(payload), 1) # Only the text body part
-        self.assertEqual(payload[0].get_content_type(), 'text/plain')
+        # Without attachments a single-part text/plain message is sent
+        self.assertFalse(email_message.is_multipart())
+        self.assertEqual(email_message.get_content_type(), 'text/plain')
+        self.assertEqual(email_message['To'], "noattach@example.com")
+        self.assertEqual(email_message.get_payload(), "This is a plain email.")
 
     # --- Tests for src.gmail_api.GmailClient (Attachment Methods) ---
     @patch('src.gmail_api.messages.get_attachment_data')
@@ -473,8 +481,8 @@ class TestAttachmentHandling(unittest.TestCase):
         
         self.assertEqual(result, sample_bytes) # Should return the bytes that were saved
         mock_get_data.assert_called_once_with(mock_client.service, "msg2", "att2")
-        mock_path_exists.assert_called_once_with(download_dir)
-        mock_makedirs.assert_called_once_with(download_dir)
+        mock_path_exists.assert_not_called()
+        mock_makedirs.assert_called_once_with(download_dir, exist_ok=True)
         mock_file_open.assert_called_once_with(full_path, 'wb')
         mock_file_open().write.assert_called_once_with(sample_bytes)
 
@@ -0,0 +1,46 @@
+"""
+Test doubles shared across the test suite.
+"""
+
+from googleapiclient.errors import HttpError
+
+
+class FakeBatchHttpRequest:
+    """Stands in for googleapiclient's BatchHttpRequest.
+
+    Queued requests are executed one by one on execute(), and their results
+    (or HttpErrors) are handed to the callback exactly as the real batch would.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        self.requests.append((request_id, request, callback or self.callback))
+
+    def execute(self):
+        for request_id, request, callback in self.requests:
+            try:
+                response, exception = request.execute(), None
+            except HttpError as error:
+                response, exception = None, error
+            if callback:
+                callback(request_id, response, exception)
+
+
+def install_fake_batch(mock_service):
+    """Make mock_service.new_batch_http_request() return FakeBatchHttpRequest objects.
+
+    Returns:
+        The list that collects every batch created, for call-count assertions.
+    """
+    batches = []
+
+    def _new_batch(callback=None):
+        batch = FakeBatchHttpRequest(callback=callback)
+        batches.append(batch)
+        return batch
+
+    mock_service.new_batch_http_request.side_effect = _new_batch
+    return batches
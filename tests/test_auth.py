@@ -0,0 +1,300 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import google.auth.exceptions
+
+from src import auth
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class TestTokenRefresher(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.token_file = os.path.join(self.tmp_dir.name, 'token.json')
+
+        self.mock_creds = MagicMock()
+        self.mock_creds.refresh_token = 'refresh-token'
+        self.mock_creds.to_json.return_value = '{"token": "new"}'
+
+        self.logger_patch = patch('src.auth.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.logger_patch.stop()
+        self.tmp_dir.cleanup()
+
+    def test_refreshes_and_saves_when_close_to_expiry(self):
+        self.mock_creds.expiry = _utcnow() + timedelta(minutes=2)
+        refresher = auth._TokenRefresher(self.mock_creds, self.token_file)
+
+        self.assertTrue(refresher.refresh_if_due())
+
+        self.mock_creds.refresh.assert_called_once_with(auth._REFRESH_REQUEST)
+        with open(self.token_file) as f:
+            self.assertEqual(f.read(), '{"token": "new"}')
+        self.assertFalse(os.path.exists(self.token_file + '.tmp'))
+
+    def test_skips_refresh_when_far_from_expiry(self):
+        self.mock_creds.expiry = _utcnow() + timedelta(hours=1)
+        refresher = auth._TokenRefresher(self.mock_creds, self.token_file)
+
+        self.assertFalse(refresher.refresh_if_due())
+        self.mock_creds.refresh.assert_not_called()
+        self.assertFalse(os.path.exists(self.token_file))
+
+    def test_skips_refresh_without_refresh_token(self):
+        self.mock_creds.expiry = _utcnow()
+        self.mock_creds.refresh_token = None
+        refresher = auth._TokenRefresher(self.mock_creds, self.token_file)
+
+        self.assertFalse(refresher.refresh_if_due())
+        self.mock_creds.refresh.assert_not_called()
+
+    def test_refresh_error_is_logged(self):
+        self.mock_creds.expiry = _utcnow()
+        self.mock_creds.refresh.side_effect = google.auth.exceptions.RefreshError('revoked')
+        refresher = auth._TokenRefresher(self.mock_creds, self.token_file)
+
+        self.assertFalse(refresher.refresh_if_due())
+        self.mock_logger.error.assert_called_once()
+        self.assertFalse(os.path.exists(self.token_file))
+
+    def test_refresh_error_stops_the_thread(self):
+        self.mock_creds.expiry = _utcnow()
+        self.mock_creds.refresh.side_effect = google.auth.exceptions.RefreshError('revoked')
+        refresher = auth._TokenRefresher(self.mock_creds, self.token_file, interval=0.01)
+
+        refresher.start()
+        refresher.join(timeout=5)
+
+        self.assertFalse(refresher.is_alive())
+        self.mock_creds.refresh.assert_called_once() # No second attempt
+
+
+class TestScopesMatch(unittest.TestCase):
+    def test_matches_same_scopes_in_any_order(self):
+        self.assertTrue(auth._scopes_match(list(reversed(auth.SCOPES))))
+
+    def test_matches_space_delimited_scopes(self):
+        self.assertTrue(auth._scopes_match(' '.join(auth.SCOPES)))
+
+    def test_rejects_missing_scope(self):
+        self.assertFalse(auth._scopes_match(auth.SCOPES[:-1]))
+
+
+class TestAtomicWrite(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'token.json')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_replaces_existing_file(self):
+        with open(self.path, 'w') as f:
+            f.write('old')
+
+        auth._atomic_write(self.path, 'new')
+
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'new')
+        self.assertEqual(os.listdir(self.tmp_dir.name), ['token.json'])
+
+    def test_failed_write_keeps_previous_file_and_cleans_up(self):
+        with open(self.path, 'w') as f:
+            f.write('old')
+
+        with patch('src.auth.os.replace', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                auth._atomic_write(self.path, 'new')
+
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'old')
+        self.assertEqual(os.listdir(self.tmp_dir.name), ['token.json'])
+
+
+class TestSaveCredentials(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.token_file = os.path.join(self.tmp_dir.name, 'token.json')
+        self.mock_creds = MagicMock()
+        self.mock_creds.token = 'access-1'
+        self.mock_creds.expiry = _utcnow()
+        self.mock_creds.to_json.return_value = '{"token": "access-1"}'
+
+    def tearDown(self):
+        auth._PERSISTED_TOKENS.pop(self.token_file, None)
+        self.tmp_dir.cleanup()
+
+    def test_unchanged_token_is_written_once(self):
+        self.assertTrue(auth._save_credentials(self.mock_creds, self.token_file))
+        self.assertFalse(auth._save_credentials(self.mock_creds, self.token_file))
+        self.mock_creds.to_json.assert_called_once()
+
+    def test_new_token_is_written_again(self):
+        auth._save_credentials(self.mock_creds, self.token_file)
+        self.mock_creds.token = 'access-2'
+        self.mock_creds.to_json.return_value = '{"token": "access-2"}'
+
+        self.assertTrue(auth._save_credentials(self.mock_creds, self.token_file))
+        with open(self.token_file) as f:
+            self.assertEqual(f.read(), '{"token": "access-2"}')
+
+
+class TestTokenFileChanged(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.token_file = os.path.join(self.tmp_dir.name, 'token.json')
+        self.mock_creds = MagicMock()
+        self.mock_creds.token = 'access-1'
+        self.mock_creds.expiry = _utcnow()
+        self.mock_creds.to_json.return_value = '{"token": "access-1"}'
+
+    def tearDown(self):
+        auth._PERSISTED_TOKENS.pop(self.token_file, None)
+        auth._TOKEN_MTIMES.pop(self.token_file, None)
+        self.tmp_dir.cleanup()
+
+    def test_own_write_is_not_a_change(self):
+        auth._save_credentials(self.mock_creds, self.token_file)
+        self.assertFalse(auth.token_file_changed(self.token_file))
+
+    def test_external_write_is_a_change(self):
+        auth._save_credentials(self.mock_creds, self.token_file)
+        stat = os.stat(self.token_file)
+        with open(self.token_file, 'w') as f:
+            f.write('{"token": "from-elsewhere"}')
+        os.utime(self.token_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        self.assertTrue(auth.token_file_changed(self.token_file))
+
+    def test_missing_file_is_not_a_change(self):
+        self.assertFalse(auth.token_file_changed(self.token_file))
+
+
+class TestEnsureValid(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.token_file = os.path.join(self.tmp_dir.name, 'token.json')
+        self.mock_creds = MagicMock()
+        self.mock_creds.to_json.return_value = '{"token": "refreshed"}'
+
+        self.logger_patch = patch('src.auth.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.logger_patch.stop()
+        self.tmp_dir.cleanup()
+
+    def test_valid_credentials_are_not_refreshed(self):
+        self.mock_creds.valid = True
+
+        self.assertTrue(auth.ensure_valid(self.mock_creds, self.token_file))
+        self.mock_creds.refresh.assert_not_called()
+        self.assertFalse(os.path.exists(self.token_file))
+
+    def test_expired_credentials_are_refreshed_and_saved(self):
+        self.mock_creds.valid = False
+        self.mock_creds.expired = True
+        self.mock_creds.refresh_token = 'refresh-token'
+
+        def _refresh(request):
+            self.mock_creds.valid = True
+        self.mock_creds.refresh.side_effect = _refresh
+
+        self.assertTrue(auth.ensure_valid(self.mock_creds, self.token_file))
+        with open(self.token_file) as f:
+            self.assertEqual(f.read(), '{"token": "refreshed"}')
+
+    def test_rejected_refresh_token_removes_token_file(self):
+        with open(self.token_file, 'w') as f:
+            f.write('{}')
+        self.mock_creds.valid = False
+        self.mock_creds.expired = True
+        self.mock_creds.refresh_token = 'revoked'
+        self.mock_creds.refresh.side_effect = google.auth.exceptions.RefreshError('revoked')
+
+        self.assertFalse(auth.ensure_valid(self.mock_creds, self.token_file))
+        self.assertFalse(os.path.exists(self.token_file))
+
+    def test_credentials_without_refresh_token_are_invalid(self):
+        self.mock_creds.valid = False
+        self.mock_creds.expired = True
+        self.mock_creds.refresh_token = None
+
+        self.assertFalse(auth.ensure_valid(self.mock_creds, self.token_file))
+        self.mock_creds.refresh.assert_not_called()
+
+
+class TestAuthenticateGoogleApi(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.token_file = os.path.join(self.tmp_dir.name, 'token.json')
+        self.credentials_file = os.path.join(self.tmp_dir.name, 'credentials.json')
+
+        self.logger_patch = patch('src.auth.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.logger_patch.stop()
+        self.tmp_dir.cleanup()
+
+    @patch('src.auth.Credentials.from_authorized_user_info')
+    def test_loads_valid_token_file(self, mock_from_info):
+        with open(self.token_file, 'w') as f:
+            f.write('{"token": "abc", "refresh_token": "def"}')
+        mock_from_info.return_value = MagicMock(valid=True)
+
+        creds = auth.authenticate_google_api(self.credentials_file, self.token_file)
+
+        self.assertIs(creds, mock_from_info.return_value)
+        mock_from_info.assert_called_once_with({'token': 'abc', 'refresh_token': 'def'}, auth.SCOPES)
+
+    @patch('src.auth.Credentials.from_authorized_user_info')
+    def test_malformed_token_file_falls_back_to_auth_flow(self, mock_from_info):
+        with open(self.token_file, 'w') as f:
+            f.write('{not json')
+
+        # No credentials.json exists, so the fallback flow cannot run
+        self.assertIsNone(auth.authenticate_google_api(self.credentials_file, self.token_file))
+        mock_from_info.assert_not_called()
+
+
+    @patch('src.auth.Credentials.from_authorized_user_info')
+    def test_non_object_token_file_falls_back_to_auth_flow(self, mock_from_info):
+        with open(self.token_file, 'w') as f:
+            f.write('["not", "an", "object"]')
+
+        self.assertIsNone(auth.load_credentials(self.token_file))
+        mock_from_info.assert_not_called()
+
+    def test_unreadable_token_file_is_treated_as_missing(self):
+        os.mkdir(self.token_file) # Exists, but reading it raises IsADirectoryError
+
+        self.assertIsNone(auth.load_credentials(self.token_file))
+        self.mock_logger.error.assert_called_once()
+
+    @patch('google_auth_oauthlib.flow.InstalledAppFlow.from_client_secrets_file')
+    def test_runs_auth_flow_without_token_file(self, mock_from_secrets):
+        with open(self.credentials_file, 'w') as f:
+            f.write('{}')
+        new_creds = MagicMock(valid=True, token='fresh', expiry=None)
+        new_creds.to_json.return_value = '{"token": "fresh"}'
+        mock_from_secrets.return_value.run_local_server.return_value = new_creds
+
+        creds = auth.authenticate_google_api(self.credentials_file, self.token_file)
+
+        self.assertIs(creds, new_creds)
+        mock_from_secrets.assert_called_once_with(self.credentials_file, auth.SCOPES)
+        with open(self.token_file) as f:
+            self.assertEqual(f.read(), '{"token": "fresh"}')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from src import batch
+from tests.fakes import install_fake_batch
+
+
+def _http_error(status):
+    return HttpError(httplib2.Response({'status': status}), b'error')
+
+
+class TestExecuteBatch(unittest.TestCase):
+    def setUp(self):
+        self.mock_service = MagicMock()
+        self.batches = install_fake_batch(self.mock_service)
+        self.results = []
+
+        self.logger_patch = patch('src.batch.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.logger_patch.stop()
+
+    def _callback(self, request_id, response, exception):
+        self.results.append((request_id, response, exception))
+
+    def _request(self, *outcomes):
+        request = MagicMock()
+        request.http = None # No credentials to copy for worker threads
+        request.execute.side_effect = list(outcomes)
+        return request
+
+    def test_requests_are_chunked_by_batch_limit(self):
+        requests = [(str(i), self._request({'id': i})) for i in range(batch.GMAIL_BATCH_LIMIT + 1)]
+
+        batch.execute_batch(self.mock_service, requests, self._callback)
+
+        self.assertEqual([len(b.requests) for b in self.batches], [batch.GMAIL_BATCH_LIMIT, 1])
+        self.assertEqual([request_id for request_id, _, _ in self.results], [str(i) for i in range(101)])
+
+    def test_transient_failures_are_retried_individually(self):
+        flaky = self._request(_http_error(429), {'id': 'b'})
+        requests = [('a', self._request({'id': 'a'})), ('b', flaky)]
+
+        batch.execute_batch(self.mock_service, requests, self._callback)
+
+        self.assertEqual(self.results, [('a', {'id': 'a'}, None), ('b', {'id': 'b'}, None)])
+        self.assertEqual(flaky.execute.call_count, 2)
+
+    def test_retried_requests_keep_their_position(self):
+        flaky = self._request(_http_error(429), {'id': 'a'})
+        requests = [('a', flaky), ('b', self._request({'id': 'b'})), ('c', self._request(_http_error(503), {'id': 'c'}))]
+
+        batch.execute_batch(self.mock_service, requests, self._callback)
+
+        self.assertEqual([request_id for request_id, _, _ in self.results], ['a', 'b', 'c'])
+        self.assertEqual(self.results[0], ('a', {'id': 'a'}, None))
+        self.assertEqual(flaky.execute.call_count, 2)
+
+    def test_permanent_failures_are_not_retried(self):
+        error = _http_error(404)
+        missing = self._request(error)
+
+        batch.execute_batch(self.mock_service, [('a', missing)], self._callback)
+
+        self.assertEqual(self.results, [('a', None, error)])
+        missing.execute.assert_called_once()
+
+    def test_rejected_batch_falls_back_to_individual_requests(self):
+        self.mock_service.new_batch_http_request.side_effect = None
+        self.mock_service.new_batch_http_request.return_value.execute.side_effect = _http_error(400)
+        requests = [('a', self._request({'id': 'a'})), ('b', self._request({'id': 'b'}))]
+
+        batch.execute_batch(self.mock_service, requests, self._callback)
+
+        self.assertEqual(self.results, [('a', {'id': 'a'}, None), ('b', {'id': 'b'}, None)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
 from unittest.mock import MagicMock, patch, ANY
+from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpMockSequence
 import base64
 from email.mime.text import MIMEText
 from email import message_from_string
@@ -9,6 +11,7 @@ from email import message_from_string
 # This might need adjustment based on how Python path is configured in the test environment.
 # For example, if 'src' is a top-level directory and tests are run from the project root.
 from src import drafts
+from tests.fakes import install_fake_batch
 
 class TestCreateMimeMessage(unittest.TestCase):
     def test_create_mime_message_structure(self):
@@ -37,6 +40,17 @@ class TestCreateMimeMessage(unittest.TestCase):
         # MIMEText body is directly available as payload if not multipart
         self.assertEqual(mime_message.get_payload(decode=True).decode('utf-8'), body)
 
+    def test_create_mime_message_is_urlsafe_base64(self):
+        # This subject makes the standard base64 alphabet emit '+' and '/'
+        subject = "~~~ ??? >>>"
+
+        result_b64 = drafts._create_mime_message("test@example.com", subject, "Body")
+        raw = base64.urlsafe_b64decode(result_b64)
+
+        self.assertEqual(result_b64, base64.urlsafe_b64encode(raw).decode('ascii'))
+        self.assertRegex(base64.b64encode(raw).decode('ascii'), r'[+/]')
+        self.assertNotRegex(result_b64, r'[+/]')
+
 class TestListDrafts(unittest.TestCase):
     def setUp(self):
         self.mock_service = MagicMock()
@@ -50,6 +64,7 @@ class TestListDrafts(unittest.TestCase):
         self.mock_users.drafts.return_value = self.mock_drafts
         self.mock_drafts.list.return_value = self.mock_list_execute
         self.mock_drafts.get.return_value = self.mock_get_execute
+        self.batches = install_fake_batch(self.mock_service)
 
         self.logger_patch = patch('src.drafts.logger')
         self.mock_logger = self.logger_patch.start()
@@ -79,14 +94,55 @@ class TestListDrafts(unittest.TestCase):
         self.mock_list_execute.execute.assert_called_once_with()
         
         # Assert calls for individual drafts
-        self.mock_drafts.get.assert_any_call(userId='me', id='draft1', format='full')
-        self.mock_drafts.get.assert_any_call(userId='me', id='draft2', format='full')
+        self.mock_drafts.get.assert_any_call(userId='me', id='draft1', format='metadata')
+        self.mock_drafts.get.assert_any_call(userId='me', id='draft2', format='metadata')
         self.assertEqual(self.mock_drafts.get.call_count, len(draft_details))
         # Check that execute was called for each get call
         self.assertEqual(self.mock_get_execute.execute.call_count, len(draft_details))
         
+        # All drafts are fetched through a single batch request
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual([req_id for req_id, _, _ in self.batches[0].requests], ['draft1', 'draft2'])
+
         self.mock_logger.info.assert_called_with("Successfully retrieved 2 drafts.")
 
+    def test_list_drafts_full_format(self):
+        self.mock_list_execute.execute.return_value = {'drafts': [{'id': 'draft1'}]}
+        self.mock_get_execute.execute.return_value = {'id': 'draft1', 'message': {'payload': {}}}
+
+        result = drafts.list_drafts(self.mock_service, format='full')
+
+        self.assertEqual(len(result), 1)
+        self.mock_drafts.get.assert_called_once_with(userId='me', id='draft1', format='full')
+
+    def test_list_drafts_falls_back_to_concurrent_fetch(self):
+        mock_http_error_response = MagicMock()
+        mock_http_error_response.status = 400
+        self.mock_service.new_batch_http_request.side_effect = None
+        self.mock_service.new_batch_http_request.return_value.execute.side_effect = HttpError(
+            resp=mock_http_error_response, content=b'Batch not supported')
+        draft_summaries = [{'id': f'draft{i}'} for i in range(5)]
+        self.mock_list_execute.execute.return_value = {'drafts': draft_summaries}
+        self.mock_get_execute.execute.side_effect = lambda **kwargs: {'id': 'fetched'}
+
+        result = drafts.list_drafts(self.mock_service)
+
+        self.assertEqual(len(result), 5)
+        self.assertEqual(self.mock_get_execute.execute.call_count, 5)
+        # Each worker thread executes on its own HTTP client
+        for call in self.mock_get_execute.execute.call_args_list:
+            self.assertIn('http', call.kwargs)
+
+    def test_list_drafts_splits_batches_at_gmail_limit(self):
+        draft_summaries = [{'id': f'draft{i}'} for i in range(150)]
+        self.mock_list_execute.execute.return_value = {'drafts': draft_summaries}
+        self.mock_get_execute.execute.side_effect = [{'id': s['id']} for s in draft_summaries]
+
+        result = drafts.list_drafts(self.mock_service, max_results=150)
+
+        self.assertEqual([d['id'] for d in result], [s['id'] for s in draft_summaries])
+        self.assertEqual([len(b.requests) for b in self.batches], [100, 50])
+
     def test_list_drafts_no_drafts_found(self):
         self.mock_list_execute.execute.return_value = {} # No 'drafts' key
         
@@ -133,6 +189,33 @@ class TestListDrafts(unittest.TestCase):
         self.mock_logger.info.assert_called_once_with("Successfully retrieved 1 drafts.")
 
 
+class TestListDraftsDiscoveryService(unittest.TestCase):
+    """Builds list_drafts requests on a real discovery-backed service, which rejects unknown parameters."""
+
+    BATCH_RESPONSE = (b'--batch_x\r\n'
+                      b'Content-Type: application/http\r\n'
+                      b'Content-ID: <response-a + draft1>\r\n\r\n'
+                      b'HTTP/1.1 200 OK\r\n'
+                      b'Content-Type: application/json\r\n\r\n'
+                      b'{"id": "draft1", "message": {"snippet": "Snippet 1"}}\r\n'
+                      b'--batch_x--\r\n')
+
+    def test_list_drafts_metadata_request(self):
+        http = HttpMockSequence([
+            ({'status': '200'}, b'{"drafts": [{"id": "draft1"}]}'),
+            ({'status': '200', 'content-type': 'multipart/mixed; boundary=batch_x'}, self.BATCH_RESPONSE),
+        ])
+        service = build('gmail', 'v1', http=http, static_discovery=True)
+
+        with patch('src.drafts.logger'):
+            result = drafts.list_drafts(service)
+
+        self.assertEqual(result, [{'id': 'draft1', 'message': {'snippet': 'Snippet 1'}}])
+        batch_uri, _, batch_body, _ = http.request_sequence[1]
+        self.assertIn('batch', batch_uri)
+        self.assertIn('GET /gmail/v1/users/me/drafts/draft1?format=metadata&alt=json', batch_body)
+
+
 class TestGetDraft(unittest.TestCase):
     def setUp(self):
         self.mock_service = MagicMock()
@@ -381,6 +464,69 @@ class TestDeleteDraft(unittest.TestCase):
         self.mock_delete_execute.execute.assert_called_once_with()
         self.mock_logger.error.assert_called_once_with(ANY)
 
+class TestBatchDeleteDrafts(unittest.TestCase):
+    def setUp(self):
+        self.mock_service = MagicMock()
+        self.mock_users = MagicMock()
+        self.mock_drafts = MagicMock()
+        self.mock_delete_execute = MagicMock()
+
+        self.mock_service.users.return_value = self.mock_users
+        self.mock_users.drafts.return_value = self.mock_drafts
+        self.mock_drafts.delete.return_value = self.mock_delete_execute
+        self.batches = install_fake_batch(self.mock_service)
+
+        self.logger_patch = patch('src.drafts.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.logger_patch.stop()
+
+    def test_batch_delete_drafts_success(self):
+        self.mock_delete_execute.execute.return_value = None
+
+        result = drafts.batch_delete_drafts(self.mock_service, ['d1', 'd2', 'd3'])
+
+        self.assertEqual(result, {"success": 3, "failed": 0, "failed_ids": []})
+        self.assertEqual(len(self.batches), 1)
+        self.mock_drafts.delete.assert_any_call(userId='me', id='d1')
+        self.assertEqual(self.mock_drafts.delete.call_count, 3)
+
+    def test_batch_delete_drafts_partial_failure(self):
+        mock_http_error_response = MagicMock()
+        mock_http_error_response.status = 404
+        self.mock_delete_execute.execute.side_effect = [
+            None,
+            HttpError(resp=mock_http_error_response, content=b'Draft not found'),
+        ]
+
+        result = drafts.batch_delete_drafts(self.mock_service, ['d1', 'missing'])
+
+        self.assertEqual(result, {"success": 1, "failed": 1, "failed_ids": ['missing']})
+        self.mock_logger.error.assert_called_once_with(ANY)
+
+    def test_batch_delete_drafts_falls_back_when_batch_rejected(self):
+        mock_http_error_response = MagicMock()
+        mock_http_error_response.status = 500
+        self.mock_service.new_batch_http_request.side_effect = None
+        self.mock_service.new_batch_http_request.return_value.execute.side_effect = HttpError(
+            resp=mock_http_error_response, content=b'Batch error')
+        self.mock_delete_execute.execute.side_effect = [
+            None,
+            HttpError(resp=mock_http_error_response, content=b'Delete error'),
+        ]
+
+        result = drafts.batch_delete_drafts(self.mock_service, ['d1', 'd2'])
+
+        self.assertEqual(result, {"success": 1, "failed": 1, "failed_ids": ['d2']})
+        self.assertEqual(self.mock_delete_execute.execute.call_count, 2)
+
+    def test_batch_delete_drafts_empty_list(self):
+        result = drafts.batch_delete_drafts(self.mock_service, [])
+
+        self.assertEqual(result, {"success": 0, "failed": 0, "failed_ids": []})
+        self.mock_service.new_batch_http_request.assert_not_called()
+
 class TestSendDraft(unittest.TestCase):
     def setUp(self):
         self.mock_service = MagicMock()
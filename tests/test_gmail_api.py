@@ -0,0 +1,554 @@
+import threading
+import unittest
+from unittest.mock import ANY, MagicMock, patch
+
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpMockSequence
+from googleapiclient.model import JsonModel
+
+from src import gmail_api
+from src.gmail_api import GmailClient
+
+
+class TestGmailClientServiceCache(unittest.TestCase):
+    def setUp(self):
+        gmail_api._SERVICE_CACHE.clear()
+
+        self.mock_creds = MagicMock()
+        self.mock_creds.valid = True
+
+        self.auth_patch = patch('src.gmail_api.authenticate_google_api', return_value=self.mock_creds)
+        self.mock_auth = self.auth_patch.start()
+        self.build_patch = patch('src.gmail_api.build')
+        self.mock_build = self.build_patch.start()
+        self.refresher_patch = patch('src.gmail_api.start_token_refresher')
+        self.mock_start_refresher = self.refresher_patch.start()
+        self.ensure_valid_patch = patch('src.gmail_api.ensure_valid', return_value=True)
+        self.mock_ensure_valid = self.ensure_valid_patch.start()
+        self.changed_patch = patch('src.gmail_api.token_file_changed', return_value=False)
+        self.mock_token_file_changed = self.changed_patch.start()
+
+    def tearDown(self):
+        self.auth_patch.stop()
+        self.build_patch.stop()
+        self.refresher_patch.stop()
+        self.ensure_valid_patch.stop()
+        self.changed_patch.stop()
+        gmail_api._SERVICE_CACHE.clear()
+
+    def test_service_is_built_once_per_credential_files(self):
+        first = GmailClient('credentials.json', 'token.json')
+        second = GmailClient('credentials.json', 'token.json')
+
+        self.assertTrue(first.authenticated)
+        self.assertTrue(second.authenticated)
+        self.assertIs(first.service, second.service)
+        self.mock_auth.assert_called_once_with('credentials.json', 'token.json')
+        self.mock_build.assert_called_once_with('gmail', 'v1', http=ANY,
+                                                cache_discovery=False, static_discovery=True, model=ANY,
+                                                requestBuilder=gmail_api._RetryingHttpRequest)
+        authed_http = self.mock_build.call_args.kwargs['http']
+        self.assertIs(authed_http.credentials, self.mock_creds)
+        self.assertEqual(authed_http.http.timeout, gmail_api.HTTP_TIMEOUT)
+        self.mock_start_refresher.assert_called_once_with(self.mock_creds, 'token.json')
+
+    def test_different_token_files_get_separate_services(self):
+        GmailClient('credentials.json', 'token_a.json')
+        GmailClient('credentials.json', 'token_b.json')
+
+        self.assertEqual(self.mock_auth.call_count, 2)
+        self.assertEqual(self.mock_build.call_count, 2)
+
+    def test_pending_authentication_does_not_block_other_token_files(self):
+        consent_given = threading.Event()
+        flow_started = threading.Event()
+
+        def _authenticate(credentials_file, token_file):
+            if token_file == 'token_a.json':
+                flow_started.set()
+                consent_given.wait(5) # Stands in for the browser consent of the OAuth flow
+            return self.mock_creds
+
+        self.mock_auth.side_effect = _authenticate
+        waiting = threading.Thread(target=GmailClient, args=('credentials.json', 'token_a.json'))
+        waiting.start()
+        try:
+            self.assertTrue(flow_started.wait(5))
+            client = GmailClient('credentials.json', 'token_b.json')
+            self.assertTrue(client.authenticated)
+            self.assertTrue(waiting.is_alive()) # token_a.json is still waiting for consent
+        finally:
+            consent_given.set()
+            waiting.join(5)
+        self.assertIn(('credentials.json', 'token_a.json'), gmail_api._SERVICE_CACHE)
+
+    def test_cached_credentials_are_validated_without_reloading(self):
+        GmailClient('credentials.json', 'token.json')
+
+        client = GmailClient('credentials.json', 'token.json')
+
+        self.assertTrue(client.authenticated)
+        self.mock_ensure_valid.assert_called_once_with(self.mock_creds, 'token.json')
+        self.mock_auth.assert_called_once()
+
+    def test_invalid_cached_credentials_reauthenticate(self):
+        GmailClient('credentials.json', 'token.json')
+        self.mock_ensure_valid.return_value = False
+        fresh_creds = MagicMock(valid=True)
+        self.mock_auth.return_value = fresh_creds
+
+        client = GmailClient('credentials.json', 'token.json')
+
+        self.assertTrue(client.authenticated)
+        self.assertEqual(self.mock_auth.call_count, 2)
+        self.assertIs(gmail_api._SERVICE_CACHE[('credentials.json', 'token.json')][0], fresh_creds)
+
+    def test_token_file_changed_on_disk_reloads_credentials(self):
+        GmailClient('credentials.json', 'token.json')
+        self.mock_token_file_changed.return_value = True
+        fresh_creds = MagicMock(valid=True)
+        self.mock_auth.return_value = fresh_creds
+
+        client = GmailClient('credentials.json', 'token.json')
+
+        self.assertTrue(client.authenticated)
+        self.mock_token_file_changed.assert_called_with('token.json')
+        self.mock_ensure_valid.assert_not_called()
+        self.assertEqual(self.mock_auth.call_count, 2)
+        self.mock_start_refresher.assert_called_with(fresh_creds, 'token.json')
+
+    def test_failed_authentication_is_not_cached(self):
+        self.mock_auth.return_value = None
+
+        client = GmailClient('credentials.json', 'token.json')
+
+        self.assertFalse(client.authenticated)
+        self.assertIsNone(client.service)
+        self.assertEqual(gmail_api._SERVICE_CACHE, {})
+
+
+@unittest.skipIf(gmail_api.orjson is None, "orjson not installed")
+class TestOrjsonModel(unittest.TestCase):
+    def setUp(self):
+        self.model = gmail_api._OrjsonModel()
+
+    def test_parses_json_bytes(self):
+        self.assertEqual(self.model.deserialize(b'{"id": "m1", "labelIds": ["INBOX"]}'),
+                         {'id': 'm1', 'labelIds': ['INBOX']})
+
+    def test_non_json_content_is_returned_as_text(self):
+        self.assertEqual(self.model.deserialize(b'not json'), 'not json')
+
+    def test_used_for_built_service(self):
+        self.assertIsInstance(gmail_api._response_model(), gmail_api._OrjsonModel)
+
+    def test_default_model_without_orjson(self):
+        with patch('src.gmail_api.orjson', None):
+            self.assertIsNone(gmail_api._response_model())
+
+
+class TestRetryingHttpRequest(unittest.TestCase):
+    BASE = 'https://gmail.googleapis.com/gmail/v1/users/me'
+
+    def setUp(self):
+        self.sleep_patch = patch('googleapiclient.http.time.sleep')
+        self.mock_sleep = self.sleep_patch.start()
+
+    def tearDown(self):
+        self.sleep_patch.stop()
+
+    def _request(self, responses, uri, method='GET'):
+        http = HttpMockSequence(responses)
+        return gmail_api._RetryingHttpRequest(http, JsonModel().response, uri, method=method), http
+
+    def test_transient_errors_are_retried(self):
+        request, _ = self._request([({'status': '503'}, b''), ({'status': '429'}, b''),
+                                    ({'status': '200'}, b'{"id": "m1"}')],
+                                   f'{self.BASE}/messages/m1')
+
+        self.assertEqual(request.execute(), {'id': 'm1'})
+        self.assertEqual(self.mock_sleep.call_count, 2)
+
+    def test_retries_are_limited(self):
+        request, _ = self._request([({'status': '500'}, b'')] * (gmail_api.API_NUM_RETRIES + 1),
+                                   f'{self.BASE}/messages/m1')
+
+        with self.assertRaises(HttpError):
+            request.execute()
+        self.assertEqual(self.mock_sleep.call_count, gmail_api.API_NUM_RETRIES)
+
+    def test_send_is_not_retried(self):
+        request, _ = self._request([({'status': '503'}, b''), ({'status': '200'}, b'{"id": "m1"}')],
+                                   f'{self.BASE}/messages/send', method='POST')
+
+        with self.assertRaises(HttpError):
+            request.execute()
+        self.mock_sleep.assert_not_called()
+
+    def test_idempotent_posts_are_retried(self):
+        request, _ = self._request([({'status': '503'}, b''), ({'status': '204'}, b'')],
+                                   f'{self.BASE}/messages/batchModify', method='POST')
+
+        request.execute()
+        self.mock_sleep.assert_called_once()
+
+
+class TestGmailClientAuthGuard(unittest.TestCase):
+    @patch('src.gmail_api.GmailClient.__init__', return_value=None)
+    def setUp(self, mock_init):
+        self.client = GmailClient(credentials_file="", token_file="")
+        self.client.service = None
+        self.client.authenticated = False
+        self.client._message_cache = gmail_api._MessageCache()
+        self.client._message_store = None
+
+        self.logger_patch = patch('src.gmail_api.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.logger_patch.stop()
+
+    @patch('src.gmail_api.messages.get_message')
+    def test_unauthenticated_call_logs_and_returns_default(self, mock_get_message):
+        self.assertIsNone(self.client.get_message('msg1'))
+        self.assertEqual(self.client.list_messages(), [])
+        self.assertFalse(self.client.delete_label('Label_1'))
+
+        mock_get_message.assert_not_called()
+        self.mock_logger.error.assert_any_call("Not authenticated. Cannot get message msg1.")
+        self.mock_logger.error.assert_any_call("Not authenticated. Cannot list messages.")
+
+    def test_unauthenticated_batch_call_reports_all_ids_failed(self):
+        result = self.client.batch_delete_messages(['a', 'b'])
+
+        self.assertEqual(result, {"success": 0, "failed": 2, "failed_ids": ['a', 'b']})
+        self.mock_logger.error.assert_called_once_with("Not authenticated. Cannot batch delete messages.")
+
+    def test_unauthenticated_default_lists_are_not_shared(self):
+        first = self.client.list_labels()
+        first.append('mutated')
+
+        self.assertEqual(self.client.list_labels(), [])
+
+    @patch('src.gmail_api.messages.get_message', return_value={'id': 'msg1'})
+    def test_authenticated_call_is_delegated(self, mock_get_message):
+        self.client.authenticated = True
+        self.client.service = MagicMock()
+
+        self.assertEqual(self.client.get_message(message_id='msg1'), {'id': 'msg1'})
+        mock_get_message.assert_called_once_with(self.client.service, 'msg1', include_body=True)
+        self.mock_logger.error.assert_not_called()
+
+
+class TestGmailClientMessageCache(unittest.TestCase):
+    @patch('src.gmail_api.GmailClient.__init__', return_value=None)
+    def setUp(self, mock_init):
+        self.client = GmailClient(credentials_file="", token_file="")
+        self.client.service = MagicMock()
+        self.client.authenticated = True
+        self.client._message_cache = gmail_api._MessageCache(max_size=2)
+        self.client._message_store = None
+        self.client._listings_cache = {}
+        self.client._listings_cache_lock = gmail_api.threading.Lock()
+        self.client._listings_generation = 0
+
+        self.get_patch = patch('src.gmail_api.messages.get_message',
+                               side_effect=lambda service, message_id, include_body=True:
+                                   {'id': message_id, 'body': 'Body' if include_body else None})
+        self.mock_get_message = self.get_patch.start()
+
+    def tearDown(self):
+        self.get_patch.stop()
+
+    def test_repeated_reads_are_served_from_cache(self):
+        first = self.client.get_message('msg1')
+        second = self.client.get_message('msg1')
+
+        self.assertEqual(first, second)
+        self.mock_get_message.assert_called_once_with(self.client.service, 'msg1', include_body=True)
+
+    def test_changing_a_returned_message_does_not_alter_the_cache(self):
+        self.mock_get_message.side_effect = lambda service, message_id, include_body=True: {
+            'id': message_id, 'body': 'Body', 'labels': ['INBOX']}
+
+        fetched = self.client.get_message('msg1')
+        fetched.pop('body')
+        fetched['labels'].append('STARRED')
+        cached = self.client.get_message('msg1')
+        cached['labels'].remove('INBOX')
+
+        self.assertEqual(self.client.get_message('msg1'), {'id': 'msg1', 'body': 'Body', 'labels': ['INBOX']})
+        self.mock_get_message.assert_called_once()
+
+    def test_header_only_fetch_is_not_cached(self):
+        self.assertIsNone(self.client.get_message('msg1', include_body=False)['body'])
+        self.assertEqual(self.client.get_message('msg1')['body'], 'Body')
+        self.assertEqual(self.client.get_message('msg1', include_body=False)['body'], 'Body')
+
+        self.assertEqual(self.mock_get_message.call_count, 2)
+        self.mock_get_message.assert_called_with(self.client.service, 'msg1', include_body=True)
+
+    def test_failed_fetch_is_not_cached(self):
+        self.mock_get_message.side_effect = None
+        self.mock_get_message.return_value = None
+
+        self.assertIsNone(self.client.get_message('msg1'))
+        self.assertIsNone(self.client.get_message('msg1'))
+        self.assertEqual(self.mock_get_message.call_count, 2)
+
+    def test_least_recently_used_message_is_evicted(self):
+        self.client.get_message('msg1')
+        self.client.get_message('msg2')
+        self.client.get_message('msg1') # msg2 is now least recently used
+        self.client.get_message('msg3')
+
+        self.client.get_message('msg1')
+        self.client.get_message('msg2')
+        fetched = [c.args[1] for c in self.mock_get_message.call_args_list]
+        self.assertEqual(fetched, ['msg1', 'msg2', 'msg3', 'msg2'])
+
+    @patch('src.gmail_api.messages.modify_message_labels')
+    @patch('src.gmail_api.messages.batch_delete_messages')
+    @patch('src.gmail_api.messages.delete_message')
+    def test_changes_invalidate_cached_messages(self, mock_delete, mock_batch_delete, mock_modify):
+        for message_id in ('a', 'b'):
+            self.client.get_message(message_id)
+
+        self.client.delete_message('a')
+        self.client.batch_delete_messages(['b'])
+        self.client.get_message('a')
+        self.client.get_message('b')
+        self.assertEqual(self.mock_get_message.call_count, 4)
+
+        self.client.modify_message_labels('b', remove_label_ids=['UNREAD'])
+        self.client.get_message('b')
+        self.assertEqual(self.mock_get_message.call_count, 5)
+
+
+class TestGmailClientListingCache(unittest.TestCase):
+    @patch('src.gmail_api.GmailClient.__init__', return_value=None)
+    def setUp(self, mock_init):
+        self.client = GmailClient(credentials_file="", token_file="")
+        self.client.service = MagicMock()
+        self.client.authenticated = True
+        self.client._message_cache = gmail_api._MessageCache()
+        self.client._message_store = None
+        self.client._listings_cache = {}
+        self.client._listings_cache_lock = gmail_api.threading.Lock()
+        self.client._listings_generation = 0
+
+        self.list_patch = patch('src.gmail_api.messages.list_messages', return_value=[{'id': 'msg1'}])
+        self.mock_list_messages = self.list_patch.start()
+        self.clock_patch = patch('src.gmail_api.time.monotonic', return_value=1000.0)
+        self.mock_clock = self.clock_patch.start()
+
+    def tearDown(self):
+        self.list_patch.stop()
+        self.clock_patch.stop()
+
+    def test_listing_is_reused_within_ttl(self):
+        self.assertEqual(self.client.list_messages(5, 'label:INBOX'), [{'id': 'msg1'}])
+        self.mock_clock.return_value += gmail_api.LISTING_CACHE_TTL - 1
+        self.assertEqual(self.client.list_messages(5, 'label:INBOX'), [{'id': 'msg1'}])
+
+        self.mock_list_messages.assert_called_once_with(self.client.service, 5, 'label:INBOX')
+
+    def test_listing_is_refetched_after_ttl_or_for_other_queries(self):
+        self.client.list_messages(5, 'label:INBOX')
+        self.client.list_messages(10, 'label:INBOX')
+        self.mock_clock.return_value += gmail_api.LISTING_CACHE_TTL
+        self.client.list_messages(5, 'label:INBOX')
+
+        self.assertEqual(self.mock_list_messages.call_count, 3)
+        self.assertEqual(len(self.client._listings_cache), 1) # Expired listing was dropped
+
+    def test_empty_listing_is_not_cached(self):
+        self.mock_list_messages.return_value = []
+        self.client.list_messages()
+        self.client.list_messages()
+
+        self.assertEqual(self.mock_list_messages.call_count, 2)
+
+    @patch('src.gmail_api.messages.send_message', return_value='sent1')
+    def test_sending_clears_listings(self, mock_send):
+        self.client.list_messages()
+        self.client.send_message('a@example.com', 'Hi', 'Body')
+        self.client.list_messages()
+
+        self.assertEqual(self.mock_list_messages.call_count, 2)
+
+    @patch('src.gmail_api.messages.send_message', return_value='sent1')
+    def test_listing_cached_during_a_send_is_cleared_after_it(self, mock_send):
+        # A listing that lands while the send is in flight still shows the old mailbox
+        mock_send.side_effect = lambda *args, **kwargs: self.client.list_messages() and 'sent1'
+
+        self.client.send_message('a@example.com', 'Hi', 'Body')
+        self.client.list_messages()
+
+        self.assertEqual(self.mock_list_messages.call_count, 2)
+
+    @patch('src.gmail_api.messages.modify_message_labels', side_effect=Exception("API error"))
+    def test_failed_change_clears_listings(self, mock_modify):
+        self.client.list_messages()
+        with self.assertRaises(Exception):
+            self.client.modify_message_labels('msg1', ['STARRED'])
+        self.client.list_messages()
+
+        self.assertEqual(self.mock_list_messages.call_count, 2)
+
+    def test_listing_fetched_across_a_change_is_not_cached(self):
+        def _list_during_change(*args):
+            self.client._clear_listings() # A change completes while this listing is in flight
+            return [{'id': 'msg1'}]
+
+        self.mock_list_messages.side_effect = _list_during_change
+        self.client.list_messages()
+
+        self.assertEqual(self.client._listings_cache, {})
+
+
+class TestGmailClientMessageStore(unittest.TestCase):
+    @patch('src.gmail_api.GmailClient.__init__', return_value=None)
+    def setUp(self, mock_init):
+        self.client = GmailClient(credentials_file="", token_file="")
+        self.client.service = MagicMock()
+        self.client.authenticated = True
+        self.client._message_cache = gmail_api._MessageCache()
+        self.client._message_store = MagicMock()
+        self.client._listings_cache = {}
+        self.client._listings_cache_lock = gmail_api.threading.Lock()
+        self.client._listings_generation = 0
+        self.stored = {'id': 'msg1', 'historyId': '100', 'labels': ['INBOX', 'UNREAD'], 'read': False, 'body': 'Hi'}
+
+        self.get_patch = patch('src.gmail_api.messages.get_message', return_value={'id': 'msg1', 'body': 'Fetched'})
+        self.mock_get_message = self.get_patch.start()
+        self.state_patch = patch('src.gmail_api.messages.get_message_state')
+        self.mock_get_state = self.state_patch.start()
+
+    def tearDown(self):
+        self.get_patch.stop()
+        self.state_patch.stop()
+
+    def test_unchanged_stored_message_skips_full_fetch(self):
+        self.client._message_store.get.return_value = self.stored
+        self.mock_get_state.return_value = {'labelIds': ['INBOX', 'UNREAD'], 'historyId': '100'}
+
+        self.assertEqual(self.client.get_message('msg1'), self.stored)
+
+        self.mock_get_message.assert_not_called()
+        self.client._message_store.put.assert_not_called()
+
+    def test_stored_message_gets_current_labels(self):
+        self.client._message_store.get.return_value = self.stored
+        self.mock_get_state.return_value = {'labelIds': ['INBOX'], 'historyId': '105'}
+
+        message = self.client.get_message('msg1')
+
+        self.assertEqual(message['labels'], ['INBOX'])
+        self.assertTrue(message['read'])
+        self.assertEqual(message['body'], 'Hi')
+        self.client._message_store.put.assert_called_once_with(message)
+        self.mock_get_message.assert_not_called()
+
+    def test_missing_message_is_fetched_and_stored(self):
+        self.client._message_store.get.return_value = None
+
+        message = self.client.get_message('msg1')
+
+        self.assertEqual(message['body'], 'Fetched')
+        self.client._message_store.put.assert_called_once_with(message)
+        self.mock_get_state.assert_not_called()
+
+    def test_unavailable_state_falls_back_to_full_fetch(self):
+        self.client._message_store.get.return_value = self.stored
+        self.mock_get_state.return_value = None
+
+        self.assertEqual(self.client.get_message('msg1')['body'], 'Fetched')
+
+    @patch('src.gmail_api.messages.delete_message', return_value=True)
+    def test_deleted_message_is_removed_from_store(self, mock_delete):
+        self.client.delete_message('msg1')
+
+        self.client._message_store.delete.assert_called_once_with(['msg1'])
+
+
+class TestGmailClientLabelCache(unittest.TestCase):
+    @patch('src.gmail_api.GmailClient.__init__', return_value=None)
+    def setUp(self, mock_init):
+        self.client = GmailClient(credentials_file="", token_file="")
+        self.client.service = MagicMock()
+        self.client.authenticated = True
+        self.client._labels_cache = None
+        self.client._labels_cache_lock = gmail_api.threading.Lock()
+
+        self.list_patch = patch('src.gmail_api.labels.list_labels', return_value=[{'id': 'INBOX'}])
+        self.mock_list_labels = self.list_patch.start()
+        self.clock_patch = patch('src.gmail_api.time.monotonic', return_value=1000.0)
+        self.mock_clock = self.clock_patch.start()
+
+    def tearDown(self):
+        self.list_patch.stop()
+        self.clock_patch.stop()
+
+    def test_labels_are_reused_within_ttl(self):
+        self.assertEqual(self.client.list_labels(), [{'id': 'INBOX'}])
+        self.mock_clock.return_value += gmail_api.LABEL_CACHE_TTL - 1
+        self.assertEqual(self.client.list_labels(), [{'id': 'INBOX'}])
+
+        self.mock_list_labels.assert_called_once_with(self.client.service)
+
+    def test_labels_are_refetched_after_ttl(self):
+        self.client.list_labels()
+        self.mock_clock.return_value += gmail_api.LABEL_CACHE_TTL
+        self.client.list_labels()
+
+        self.assertEqual(self.mock_list_labels.call_count, 2)
+
+    def test_failed_listing_is_not_cached(self):
+        self.mock_list_labels.return_value = []
+        self.client.list_labels()
+        self.client.list_labels()
+
+        self.assertEqual(self.mock_list_labels.call_count, 2)
+
+    def test_callers_cannot_alter_cached_labels(self):
+        self.client.list_labels().append({'id': 'mutated'})
+
+        self.assertEqual(self.client.list_labels(), [{'id': 'INBOX'}])
+
+    @patch('src.gmail_api.labels.delete_label', return_value=True)
+    @patch('src.gmail_api.labels.create_label', return_value={'id': 'Label_1'})
+    def test_label_changes_clear_cache(self, mock_create, mock_delete):
+        self.client.list_labels()
+        self.client.create_label('Receipts')
+        self.client.list_labels()
+        self.client.delete_label('Label_1')
+        self.client.list_labels()
+
+        self.assertEqual(self.mock_list_labels.call_count, 3)
+
+    @patch('src.gmail_api.labels.create_label', return_value={'id': 'Label_1'})
+    def test_listing_in_flight_cannot_undo_invalidation(self, mock_create):
+        fetching = threading.Event()
+        release = threading.Event()
+
+        def _slow_list(service):
+            fetching.set()
+            release.wait(5)
+            return [{'id': 'INBOX'}] # Fetched before the new label existed
+
+        self.mock_list_labels.side_effect = _slow_list
+        listing = threading.Thread(target=self.client.list_labels)
+        listing.start()
+        self.assertTrue(fetching.wait(5))
+        creating = threading.Thread(target=self.client.create_label, args=('Receipts',))
+        creating.start()
+        release.set()
+        listing.join(5)
+        creating.join(5)
+
+        self.assertIsNone(self.client._labels_cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
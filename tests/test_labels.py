@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from googleapiclient.errors import HttpError
+
+from src import labels
+
+
+class TestLabelCalls(unittest.TestCase):
+    def setUp(self):
+        self.mock_service = MagicMock()
+        self.mock_labels = self.mock_service.users.return_value.labels.return_value
+
+        self.logger_patch = patch('src.labels.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.logger_patch.stop()
+
+    def _http_error(self, status):
+        mock_resp = MagicMock()
+        mock_resp.status = status
+        return HttpError(resp=mock_resp, content=b'error')
+
+    def test_list_labels(self):
+        self.mock_labels.list.return_value.execute.return_value = {'labels': [{'id': 'INBOX'}]}
+
+        self.assertEqual(labels.list_labels(self.mock_service), [{'id': 'INBOX'}])
+
+    def test_list_labels_error_returns_fresh_empty_list(self):
+        self.mock_labels.list.return_value.execute.side_effect = self._http_error(500)
+
+        first = labels.list_labels(self.mock_service)
+        second = labels.list_labels(self.mock_service)
+
+        self.assertEqual(first, [])
+        self.assertIsNot(first, second)
+        self.mock_logger.error.assert_called_with(f"Error listing labels: {self.mock_labels.list.return_value.execute.side_effect}")
+
+    def test_get_label_not_found_logs_warning(self):
+        self.mock_labels.get.return_value.execute.side_effect = self._http_error(404)
+
+        self.assertIsNone(labels.get_label(self.mock_service, 'Label_9'))
+        self.mock_logger.warning.assert_called_once_with("Label with ID Label_9 not found.")
+        self.mock_logger.error.assert_not_called()
+
+    def test_create_label_conflict_logs_warning(self):
+        self.mock_labels.create.return_value.execute.side_effect = self._http_error(409)
+
+        self.assertIsNone(labels.create_label(self.mock_service, 'Work'))
+        self.mock_logger.warning.assert_called_once_with("Label with name 'Work' might already exist.")
+
+    def test_delete_label_unexpected_error_returns_false(self):
+        self.mock_labels.delete.return_value.execute.side_effect = RuntimeError('boom')
+
+        self.assertFalse(labels.delete_label(self.mock_service, label_id='Label_1'))
+        self.mock_logger.error.assert_called_once_with("Error deleting label Label_1: boom")
+
+    def test_delete_label(self):
+        self.assertTrue(labels.delete_label(self.mock_service, 'Label_1'))
+        self.mock_labels.delete.assert_called_once_with(userId='me', id='Label_1')
+
+
+if __name__ == '__main__':
+    unittest.main()
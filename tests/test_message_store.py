@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import stat
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src import message_store
+from src.message_store import MessageStore
+
+
+class TestMessageStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'messages.db')
+        self.store = MessageStore(self.path)
+        self.message = {'id': 'msg1', 'historyId': '100', 'subject': 'Grüße', 'labels': ['INBOX'],
+                        'body': 'Hello', 'attachments': []}
+
+        self.logger_patch = patch('src.message_store.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.logger_patch.stop()
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        self.store.put(self.message)
+        self.assertEqual(self.store.get('msg1'), self.message)
+        self.assertIsNone(self.store.get('other'))
+
+    def test_survives_reopening(self):
+        self.store.put(self.message)
+        self.store.close()
+
+        self.store = MessageStore(self.path)
+        self.assertEqual(self.store.get('msg1'), self.message)
+
+    def test_put_replaces_stored_copy(self):
+        self.store.put(self.message)
+        self.store.put(dict(self.message, historyId='105', labels=[]))
+
+        self.assertEqual(self.store.get('msg1')['historyId'], '105')
+
+    def test_delete(self):
+        self.store.put(self.message)
+        self.store.put(dict(self.message, id='msg2'))
+
+        self.store.delete(['msg1', 'missing'])
+
+        self.assertIsNone(self.store.get('msg1'))
+        self.assertIsNotNone(self.store.get('msg2'))
+
+    def test_store_with_older_schema_is_rebuilt(self):
+        self.store.close()
+        os.remove(self.path)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE messages ("
+                     "id TEXT PRIMARY KEY, history_id TEXT, data BLOB NOT NULL, fetched_at INTEGER NOT NULL)")
+        conn.commit()
+        conn.close()
+
+        self.store = MessageStore(self.path)
+        self.store.put(self.message)
+
+        self.assertEqual(self.store.get('msg1'), self.message)
+        self.mock_logger.error.assert_not_called()
+
+    def test_file_is_owner_only(self):
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode) & 0o077, 0)
+
+    def test_stdlib_json_fallback(self):
+        with patch('src.message_store.orjson', None):
+            self.store.put(self.message)
+            self.assertEqual(self.store.get('msg1'), self.message)
+
+    def test_storage_errors_are_misses(self):
+        self.store.close()
+
+        self.assertIsNone(self.store.get('msg1'))
+        self.store.put(self.message)
+        self.assertEqual(self.mock_logger.error.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
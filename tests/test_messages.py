@@ -0,0 +1,578 @@
+import base64
+import io
+import unittest
+from email import message_from_bytes
+from email.header import decode_header, make_header
+from unittest.mock import MagicMock, patch
+
+from googleapiclient.errors import HttpError
+
+from src import messages
+from tests.fakes import install_fake_batch
+
+
+def _b64url(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii')
+
+
+class TestExtractHeaders(unittest.TestCase):
+    def test_lowercases_header_names(self):
+        payload = {'headers': [
+            {'name': 'From', 'value': 'a@example.com'},
+            {'name': 'Message-ID', 'value': '<id@example.com>'},
+        ]}
+        self.assertEqual(messages._extract_headers(payload),
+                         {'from': 'a@example.com', 'message-id': '<id@example.com>'})
+
+    def test_keeps_only_wanted_headers(self):
+        payload = {'headers': [
+            {'name': 'Received', 'value': 'from mx.example.com'},
+            {'name': 'SUBJECT', 'value': 'Hi'},
+        ]}
+        self.assertEqual(messages._extract_headers(payload, frozenset({'subject'})), {'subject': 'Hi'})
+
+    def test_missing_headers(self):
+        self.assertEqual(messages._extract_headers({}), {})
+
+
+class TestGetMessageBody(unittest.TestCase):
+    def setUp(self):
+        self.logger_patch = patch('src.messages.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.logger_patch.stop()
+
+    def test_decodes_single_part_body(self):
+        payload = {'body': {'data': _b64url('Hello world')}}
+        self.assertEqual(messages._get_message_body(payload), 'Hello world')
+
+    def test_decodes_unpadded_body(self):
+        data = _b64url('Hi!!').rstrip('=')
+        self.assertEqual(messages._get_message_body({'body': {'data': data}}), 'Hi!!')
+
+    def test_decodes_urlsafe_alphabet(self):
+        text = 'ûÿþ?>'
+        data = _b64url(text)
+        self.assertRegex(data, r'[-_]')
+        self.assertEqual(messages._get_message_body({'body': {'data': data}}), text)
+
+    def test_decodes_declared_charset(self):
+        data = base64.urlsafe_b64encode('Café – €5'.encode('cp1252')).decode('ascii')
+        payload = {'headers': [{'name': 'Content-Type', 'value': 'text/plain; charset="windows-1252"'}],
+                   'body': {'data': data}}
+        self.assertEqual(messages._get_message_body(payload), 'Café – €5')
+
+    def test_nested_parts_use_their_own_charset(self):
+        latin = base64.urlsafe_b64encode('Grüße'.encode('latin-1')).decode('ascii')
+        payload = {'parts': [
+            {'mimeType': 'text/plain', 'headers': [{'name': 'Content-Type', 'value': 'text/plain; charset=ISO-8859-1'}],
+             'body': {'data': latin}},
+            {'mimeType': 'text/plain', 'body': {'data': _b64url('Grüße')}},
+        ]}
+        self.assertEqual(messages._get_message_body(payload), 'Grüße\n---\nGrüße')
+
+    def test_undecodable_bytes_are_replaced(self):
+        data = base64.urlsafe_b64encode(b'Caf\xe9').decode('ascii')
+        self.assertEqual(messages._get_message_body({'body': {'data': data}}), 'Caf\ufffd')
+
+    def test_unknown_charset_falls_back_to_utf8(self):
+        payload = {'headers': [{'name': 'Content-Type', 'value': 'text/plain; charset=x-unknown'}],
+                   'body': {'data': _b64url('Hello')}}
+        self.assertEqual(messages._get_message_body(payload), 'Hello')
+
+    def test_invalid_base64_returns_placeholder(self):
+        payload = {'body': {'data': 'not*valid*base64'}}
+        self.assertEqual(messages._get_message_body(payload), '[Decoding Error]')
+
+    def test_prefers_plain_text_over_html(self):
+        payload = {'parts': [
+            {'mimeType': 'text/html', 'body': {'data': _b64url('<p>Hi</p>')}},
+            {'mimeType': 'text/plain', 'body': {'data': _b64url('Hi')}},
+        ]}
+        self.assertEqual(messages._get_message_body(payload), 'Hi')
+
+    def test_collects_plain_text_from_nested_multiparts_in_order(self):
+        payload = {'mimeType': 'multipart/mixed', 'parts': [
+            {'mimeType': 'multipart/alternative', 'parts': [
+                {'mimeType': 'text/plain', 'body': {'data': _b64url('First')}},
+                {'mimeType': 'text/html', 'body': {'data': _b64url('<p>First</p>')}},
+            ]},
+            {'mimeType': 'application/pdf', 'filename': 'a.pdf', 'body': {'attachmentId': 'att1'}},
+            {'mimeType': 'text/plain', 'body': {'data': _b64url('Second')}},
+        ]}
+        self.assertEqual(messages._get_message_body(payload), 'First\n---\nSecond')
+
+    def test_html_alternative_is_not_decoded_when_plain_text_exists(self):
+        payload = {'parts': [
+            {'mimeType': 'text/html', 'body': {'data': _b64url('<p>Hi</p>')}},
+            {'mimeType': 'text/plain', 'body': {'data': _b64url('Hi')}},
+        ]}
+        with patch('src.messages._decode_body_data', wraps=messages._decode_body_data) as mock_decode:
+            self.assertEqual(messages._get_message_body(payload), 'Hi')
+        mock_decode.assert_called_once_with(_b64url('Hi'), 'utf-8')
+
+    def test_falls_back_to_nested_html(self):
+        payload = {'parts': [
+            {'mimeType': 'multipart/related', 'parts': [
+                {'mimeType': 'text/html', 'body': {'data': _b64url('<p>Only</p>')}},
+            ]},
+        ]}
+        self.assertEqual(messages._get_message_body(payload), '<p>Only</p>')
+
+    def test_stdlib_codec_fallback(self):
+        with patch('src.messages._base64_codec', base64):
+            payload = {'body': {'data': _b64url('Fallback body')}}
+            self.assertEqual(messages._get_message_body(payload), 'Fallback body')
+            self.assertEqual(messages._b64url_encode(b'\xfb\xff'), b'-_8=')
+
+
+class TestExtractAttachmentInfo(unittest.TestCase):
+    def _part(self, content_disposition):
+        return {'partId': '2', 'mimeType': 'application/pdf', 'body': {'attachmentId': 'att1', 'size': 10},
+                'headers': [{'name': 'content-disposition', 'value': content_disposition}]}
+
+    def test_filename_followed_by_other_parameters(self):
+        info = messages._extract_attachment_info(self._part('attachment; filename="a b.pdf"; size=10'))
+
+        self.assertEqual(info['filename'], 'a b.pdf')
+
+    def test_rfc2231_filename_takes_precedence(self):
+        info = messages._extract_attachment_info(
+            self._part("attachment; filename=\"naive.pdf\"; filename*=UTF-8''na%C3%AFve.pdf"))
+
+        self.assertEqual(info['filename'], 'na\u00efve.pdf')
+
+    def test_disposition_without_filename(self):
+        self.assertIsNone(messages._extract_attachment_info(self._part('inline')))
+
+
+class TestGetMessage(unittest.TestCase):
+    def setUp(self):
+        self.mock_service = MagicMock()
+        self.mock_messages = self.mock_service.users.return_value.messages.return_value
+        self.mock_messages.get.return_value.execute.return_value = {
+            'id': 'm1', 'threadId': 't1', 'labelIds': ['INBOX', 'UNREAD'],
+            'payload': {
+                'headers': [{'name': 'Subject', 'value': 'Hello'}],
+                'body': {'data': _b64url('Body text')},
+            },
+        }
+
+        self.logger_patch = patch('src.messages.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.logger_patch.stop()
+
+    def test_decodes_body(self):
+        message = messages.get_message(self.mock_service, 'm1')
+
+        self.assertEqual(message['subject'], 'Hello')
+        self.assertFalse(message['read'])
+        self.assertEqual(message['body'], 'Body text')
+
+    def test_body_decoding_can_be_skipped(self):
+        with patch('src.messages._get_message_body') as mock_get_body:
+            message = messages.get_message(self.mock_service, 'm1', include_body=False)
+
+        mock_get_body.assert_not_called()
+        self.assertIsNone(message['body'])
+        self.assertEqual(message['subject'], 'Hello')
+
+    def test_get_message_state_fetches_labels_only(self):
+        self.mock_messages.get.return_value.execute.return_value = {'labelIds': ['INBOX'], 'historyId': '42'}
+
+        state = messages.get_message_state(self.mock_service, 'm1')
+
+        self.assertEqual(state, {'labelIds': ['INBOX'], 'historyId': '42'})
+        self.mock_messages.get.assert_called_with(userId='me', id='m1', format='minimal',
+                                                  fields='labelIds,historyId')
+
+
+class TestBuildPlainMessage(unittest.TestCase):
+    def test_ascii_body_is_sent_as_7bit(self):
+        raw = messages._build_plain_message([('To', 'a@example.com'), ('Subject', 'Hi')], 'Line 1\nLine 2')
+
+        self.assertIn(b'\r\n\r\nLine 1\r\nLine 2', raw)
+        parsed = message_from_bytes(raw)
+        self.assertEqual(parsed['To'], 'a@example.com')
+        self.assertEqual(parsed['Subject'], 'Hi')
+        self.assertEqual(parsed['Content-Transfer-Encoding'], '7bit')
+        self.assertEqual(parsed.get_content_charset(), 'us-ascii')
+
+    def test_non_ascii_is_encoded(self):
+        raw = messages._build_plain_message([('Subject', 'Grüße')], 'Héllo wörld')
+
+        raw.decode('ascii') # Raw message stays 7-bit clean
+        parsed = message_from_bytes(raw)
+        self.assertEqual(str(make_header(decode_header(parsed['Subject']))), 'Grüße')
+        self.assertEqual(parsed['Content-Transfer-Encoding'], 'base64')
+        self.assertEqual(parsed.get_payload(decode=True).decode('utf-8'), 'Héllo wörld')
+
+    def test_long_encoded_header_is_folded_with_crlf(self):
+        subject = 'Héllo ' * 30
+
+        raw = messages._build_plain_message([('Subject', subject)], 'Body')
+
+        head = raw.split(b'\r\n\r\n', 1)[0]
+        self.assertIn(b'\r\n ', head) # Folded onto continuation lines
+        self.assertNotRegex(head, rb'(?<!\r)\n')
+        parsed = message_from_bytes(raw)
+        self.assertEqual(str(make_header(decode_header(parsed['Subject']))), subject)
+
+    def test_long_ascii_header_is_folded(self):
+        references = ' '.join(f'<message{i}.1234567890@mail.example.com>' for i in range(40))
+        self.assertGreater(len(references), 998)
+
+        raw = messages._build_plain_message([('To', 'a@example.com'), ('References', references)], 'Body')
+
+        head = raw.split(b'\r\n\r\n', 1)[0]
+        self.assertLessEqual(max(len(line) for line in head.split(b'\r\n')), 78)
+        self.assertNotRegex(head, rb'(?<!\r)\n')
+        self.assertEqual(message_from_bytes(raw)['References'].replace('\r\n', ''), references)
+
+    def test_body_keeps_trailing_newline_and_form_feeds(self):
+        raw = messages._build_plain_message([('Subject', 'Hi')], 'hi\n\x0cpage2\n')
+
+        self.assertTrue(raw.endswith(b'\r\n\r\nhi\r\n\x0cpage2\r\n'))
+        self.assertNotRegex(raw, rb'(?<!\r)\n')
+
+    def test_header_line_breaks_are_rejected(self):
+        with self.assertRaises(ValueError):
+            messages._build_plain_message([('Subject', 'Hi\r\nBcc: x@example.com')], 'Body')
+
+
+class TestEncodeAttachment(unittest.TestCase):
+    def test_matches_single_pass_encoding_across_chunks(self):
+        data = bytes(range(256)) * (messages._ATTACHMENT_CHUNK_SIZE // 100)
+
+        encoded = messages._encode_attachment(io.BytesIO(data))
+
+        self.assertEqual(encoded, base64.encodebytes(data).decode('ascii'))
+
+    def test_empty_file(self):
+        self.assertEqual(messages._encode_attachment(io.BytesIO(b'')), '')
+
+
+class TestReplyToMessage(unittest.TestCase):
+    def setUp(self):
+        self.mock_service = MagicMock()
+        self.mock_messages = self.mock_service.users.return_value.messages.return_value
+        self.mock_messages.get.return_value.execute.return_value = {
+            'id': 'orig', 'threadId': 'thread-1',
+            'payload': {'headers': [
+                {'name': 'From', 'value': 'sender@example.com'},
+                {'name': 'Subject', 'value': 'Lunch'},
+                {'name': 'Message-ID', 'value': '<orig@example.com>'},
+                {'name': 'References', 'value': '<first@example.com>'},
+            ]},
+        }
+        self.mock_messages.send.return_value.execute.return_value = {'id': 'reply-1'}
+
+        self.logger_patch = patch('src.messages.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.logger_patch.stop()
+
+    def test_reply_threads_with_original(self):
+        self.assertEqual(messages.reply_to_message(self.mock_service, 'orig', 'Sounds good'), 'reply-1')
+
+        body = self.mock_messages.send.call_args.kwargs['body']
+        self.assertEqual(body['threadId'], 'thread-1')
+        self.mock_messages.get.assert_called_once_with(
+            userId='me', id='orig', format='metadata',
+            metadataHeaders=['Subject', 'From', 'To', 'Cc', 'Reply-To', 'Message-ID', 'References'])
+        parsed = message_from_bytes(base64.urlsafe_b64decode(body['raw']))
+        self.assertEqual(parsed['To'], 'sender@example.com')
+        self.assertEqual(parsed['Subject'], 'Re: Lunch')
+        self.assertEqual(parsed['In-Reply-To'], '<orig@example.com>')
+        self.assertEqual(parsed['References'], '<first@example.com> <orig@example.com>')
+        self.assertEqual(parsed.get_payload(), 'Sounds good')
+
+    def test_reply_with_known_headers_skips_fetch(self):
+        headers = {'from': 'sender@example.com', 'subject': 'Re: Lunch', 'message-id': '<orig@example.com>'}
+
+        result = messages.reply_to_message(self.mock_service, 'orig', 'Sure', original_headers=headers,
+                                           thread_id='thread-1')
+
+        self.assertEqual(result, 'reply-1')
+        self.mock_messages.get.assert_not_called()
+        body = self.mock_messages.send.call_args.kwargs['body']
+        self.assertEqual(body['threadId'], 'thread-1')
+        parsed = message_from_bytes(base64.urlsafe_b64decode(body['raw']))
+        self.assertEqual(parsed['Subject'], 'Re: Lunch')
+        self.assertEqual(parsed['References'], '<orig@example.com>')
+
+
+class TestListMessages(unittest.TestCase):
+    def setUp(self):
+        self.mock_service = MagicMock()
+        self.mock_messages = self.mock_service.users.return_value.messages.return_value
+        self.mock_list_execute = self.mock_messages.list.return_value
+        self.mock_get_execute = self.mock_messages.get.return_value
+        self.batches = install_fake_batch(self.mock_service)
+
+        self.logger_patch = patch('src.messages.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.logger_patch.stop()
+
+    def _message(self, message_id, subject, labels=('INBOX',)):
+        return {
+            'id': message_id,
+            'threadId': f'thread-{message_id}',
+            'snippet': f'Snippet {message_id}',
+            'labelIds': list(labels),
+            'payload': {'headers': [
+                {'name': 'From', 'value': 'sender@example.com'},
+                {'name': 'Subject', 'value': subject},
+            ]},
+        }
+
+    def test_list_messages_fetches_details_in_one_batch(self):
+        self.mock_list_execute.execute.return_value = {'messages': [{'id': 'm1'}, {'id': 'm2'}]}
+        self.mock_get_execute.execute.side_effect = [
+            self._message('m1', 'First', labels=('INBOX', 'UNREAD')),
+            self._message('m2', 'Second'),
+        ]
+
+        result = messages.list_messages(self.mock_service, max_results=2, query='label:INBOX')
+
+        self.mock_messages.list.assert_called_once_with(userId='me', maxResults=2, q='label:INBOX')
+        self.mock_messages.get.assert_any_call(userId='me', id='m1', format='metadata',
+                                               metadataHeaders=['From', 'To', 'Subject', 'Date'])
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual([m['id'] for m in result], ['m1', 'm2'])
+        self.assertEqual(result[0]['subject'], 'First')
+        self.assertEqual(result[0]['from'], 'sender@example.com')
+        self.assertFalse(result[0]['read'])
+        self.assertTrue(result[1]['read'])
+
+    def test_list_messages_skips_failed_message(self):
+        self.mock_list_execute.execute.return_value = {'messages': [{'id': 'm1'}, {'id': 'gone'}]}
+        mock_resp = MagicMock()
+        mock_resp.status = 404
+        self.mock_get_execute.execute.side_effect = [
+            self._message('m1', 'First'),
+            HttpError(resp=mock_resp, content=b'Not found'),
+        ]
+
+        result = messages.list_messages(self.mock_service)
+
+        self.assertEqual([m['id'] for m in result], ['m1'])
+        self.mock_logger.error.assert_called_once()
+
+    def test_list_messages_follows_page_tokens(self):
+        self.mock_list_execute.execute.side_effect = [
+            {'messages': [{'id': f'a{i}'} for i in range(messages.LIST_PAGE_SIZE)], 'nextPageToken': 'page-2'},
+            {'messages': [{'id': 'b0'}, {'id': 'b1'}, {'id': 'b2'}], 'nextPageToken': 'page-3'},
+        ]
+        self.mock_get_execute.execute.side_effect = lambda: self._message('x', 'Subject')
+
+        result = messages.list_messages(self.mock_service, max_results=messages.LIST_PAGE_SIZE + 2)
+
+        self.assertEqual(len(result), messages.LIST_PAGE_SIZE + 2)
+        self.assertEqual(len(self.batches), 2)
+        self.mock_messages.list.assert_called_with(userId='me', maxResults=2, q='', pageToken='page-2')
+        self.assertEqual(self.mock_messages.list.call_count, 2)
+
+    def test_iter_messages_yields_first_page_before_listing_the_next(self):
+        self.mock_list_execute.execute.side_effect = [
+            {'messages': [{'id': 'm1'}], 'nextPageToken': 'page-2'},
+            {'messages': [{'id': 'm2'}]},
+        ]
+        self.mock_get_execute.execute.side_effect = [self._message('m1', 'First'), self._message('m2', 'Second')]
+        with patch('src.messages.LIST_PAGE_SIZE', 1):
+            iterator = messages.iter_messages(self.mock_service, max_results=5)
+
+            self.assertEqual(next(iterator)['id'], 'm1')
+            self.assertEqual(self.mock_messages.list.call_count, 1)
+            self.assertEqual([m['id'] for m in iterator], ['m2'])
+
+    def test_list_messages_no_results(self):
+        self.mock_list_execute.execute.return_value = {}
+
+        self.assertEqual(messages.list_messages(self.mock_service), [])
+        self.assertEqual(self.batches, [])
+
+
+class TestBatchDeleteMessages(unittest.TestCase):
+    def setUp(self):
+        self.mock_service = MagicMock()
+        self.mock_messages = self.mock_service.users.return_value.messages.return_value
+        self.mock_modify_execute = self.mock_messages.batchModify.return_value
+        self.mock_trash_execute = self.mock_messages.trash.return_value
+        self.batches = install_fake_batch(self.mock_service)
+
+        self.logger_patch = patch('src.messages.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.logger_patch.stop()
+
+    def _http_error(self, status):
+        mock_resp = MagicMock()
+        mock_resp.status = status
+        return HttpError(resp=mock_resp, content=b'error')
+
+    def test_trashes_with_single_batch_modify(self):
+        result = messages.batch_delete_messages(self.mock_service, ['m1', 'm2'])
+
+        self.assertEqual(result, {"success": 2, "failed": 0, "failed_ids": []})
+        self.mock_messages.batchModify.assert_called_once_with(
+            userId='me', body={'ids': ['m1', 'm2'], 'addLabelIds': ['TRASH'], 'removeLabelIds': []})
+        self.mock_messages.trash.assert_not_called()
+
+    def test_chunks_at_batch_modify_limit(self):
+        ids = [f'm{i}' for i in range(messages.BATCH_MODIFY_LIMIT + 5)]
+
+        result = messages.batch_delete_messages(self.mock_service, ids)
+
+        self.assertEqual(result["success"], len(ids))
+        chunk_sizes = [len(call.kwargs['body']['ids']) for call in self.mock_messages.batchModify.call_args_list]
+        self.assertEqual(chunk_sizes, [messages.BATCH_MODIFY_LIMIT, 5])
+
+    def test_falls_back_to_per_message_trash(self):
+        self.mock_modify_execute.execute.side_effect = self._http_error(400)
+        self.mock_trash_execute.execute.side_effect = [{'id': 'm1'}, self._http_error(404)]
+
+        result = messages.batch_delete_messages(self.mock_service, ['m1', 'missing'])
+
+        self.assertEqual(result, {"success": 1, "failed": 1, "failed_ids": ['missing']})
+        self.assertEqual(len(self.batches), 1)
+        self.mock_messages.trash.assert_any_call(userId='me', id='missing')
+
+    def test_empty_list_makes_no_calls(self):
+        result = messages.batch_delete_messages(self.mock_service, [])
+
+        self.assertEqual(result, {"success": 0, "failed": 0, "failed_ids": []})
+        self.mock_messages.batchModify.assert_not_called()
+
+
+class TestBatchModifyMessageLabels(unittest.TestCase):
+    def setUp(self):
+        self.mock_service = MagicMock()
+        self.mock_messages = self.mock_service.users.return_value.messages.return_value
+        self.mock_batch_modify_execute = self.mock_messages.batchModify.return_value
+        self.mock_modify_execute = self.mock_messages.modify.return_value
+        self.batches = install_fake_batch(self.mock_service)
+
+        self.logger_patch = patch('src.messages.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.logger_patch.stop()
+
+    def _http_error(self, status):
+        mock_resp = MagicMock()
+        mock_resp.status = status
+        return HttpError(resp=mock_resp, content=b'error')
+
+    def test_modifies_with_single_batch_modify(self):
+        result = messages.batch_modify_message_labels(self.mock_service, ['m1', 'm2'],
+                                                      remove_label_ids=['UNREAD'])
+
+        self.assertEqual(result, {"success": 2, "failed": 0, "failed_ids": []})
+        self.mock_messages.batchModify.assert_called_once_with(
+            userId='me', body={'ids': ['m1', 'm2'], 'addLabelIds': [], 'removeLabelIds': ['UNREAD']})
+        self.mock_messages.modify.assert_not_called()
+
+    def test_chunks_at_batch_modify_limit(self):
+        ids = [f'm{i}' for i in range(messages.BATCH_MODIFY_LIMIT + 1)]
+
+        result = messages.batch_modify_message_labels(self.mock_service, ids, add_label_ids=['Label_1'])
+
+        self.assertEqual(result["success"], len(ids))
+        self.assertEqual(self.mock_messages.batchModify.call_count, 2)
+
+    def test_falls_back_to_per_message_modify(self):
+        self.mock_batch_modify_execute.execute.side_effect = self._http_error(400)
+        self.mock_modify_execute.execute.side_effect = [{'id': 'm1'}, self._http_error(404)]
+
+        result = messages.batch_modify_message_labels(self.mock_service, ['m1', 'missing'],
+                                                      add_label_ids=['STARRED'])
+
+        self.assertEqual(result, {"success": 1, "failed": 1, "failed_ids": ['missing']})
+        self.mock_messages.modify.assert_any_call(
+            userId='me', id='missing', body={'addLabelIds': ['STARRED'], 'removeLabelIds': []})
+
+    def test_no_labels_makes_no_calls(self):
+        result = messages.batch_modify_message_labels(self.mock_service, ['m1'])
+
+        self.assertEqual(result, {"success": 0, "failed": 0, "failed_ids": []})
+        self.mock_messages.batchModify.assert_not_called()
+
+    def test_label_names_are_rejected_without_a_call(self):
+        result = messages.batch_modify_message_labels(self.mock_service, ['m1', 'm2'],
+                                                      add_label_ids=['Work'])
+
+        self.assertEqual(result, {"success": 0, "failed": 2, "failed_ids": ['m1', 'm2']})
+        self.mock_messages.batchModify.assert_not_called()
+        self.mock_logger.error.assert_called_once()
+
+
+class TestModifyMessageLabels(unittest.TestCase):
+    def setUp(self):
+        self.mock_service = MagicMock()
+        self.mock_messages = self.mock_service.users.return_value.messages.return_value
+
+        self.logger_patch = patch('src.messages.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.logger_patch.stop()
+
+    def test_modifies_labels(self):
+        self.mock_messages.modify.return_value.execute.return_value = {'id': 'm1'}
+
+        result = messages.modify_message_labels(self.mock_service, 'm1', add_label_ids=['CATEGORY_SOCIAL'],
+                                                remove_label_ids=['Label_12'])
+
+        self.assertEqual(result, {'id': 'm1'})
+        self.mock_messages.modify.assert_called_once_with(
+            userId='me', id='m1', body={'addLabelIds': ['CATEGORY_SOCIAL'], 'removeLabelIds': ['Label_12']})
+
+    def test_invalid_label_id_makes_no_call(self):
+        result = messages.modify_message_labels(self.mock_service, 'm1', add_label_ids=['Label_1', 'important'])
+
+        self.assertIsNone(result)
+        self.mock_messages.modify.assert_not_called()
+        self.mock_logger.error.assert_called_once()
+
+    def test_same_labels_added_and_removed_makes_no_call(self):
+        result = messages.modify_message_labels(self.mock_service, 'm1', add_label_ids=['STARRED'],
+                                                remove_label_ids=['STARRED'])
+
+        self.assertIsNone(result)
+        self.mock_messages.modify.assert_not_called()
+
+
+class TestGetAttachmentData(unittest.TestCase):
+    def setUp(self):
+        self.mock_service = MagicMock()
+        self.mock_get = self.mock_service.users.return_value.messages.return_value.attachments.return_value.get
+
+        self.logger_patch = patch('src.messages.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.logger_patch.stop()
+
+    def test_decodes_unpadded_data(self):
+        data = base64.urlsafe_b64encode(b'\xfb\xffpdf').decode().rstrip('=')
+        self.mock_get.return_value.execute.return_value = {'data': data}
+
+        self.assertEqual(messages.get_attachment_data(self.mock_service, 'm1', 'a1'), b'\xfb\xffpdf')
+
+    def test_invalid_data_returns_none(self):
+        self.mock_get.return_value.execute.return_value = {'data': 'not base64!'}
+
+        self.assertIsNone(messages.get_attachment_data(self.mock_service, 'm1', 'a1'))
+        self.mock_logger.error.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+from unittest.mock import MagicMock
+
+from src.resources import user_resource
+
+
+class TestUserResource(unittest.TestCase):
+
+    def test_builds_each_collection_once_per_service(self):
+        service = MagicMock()
+
+        first = user_resource(service, 'messages')
+        second = user_resource(service, 'messages')
+
+        self.assertIs(first, second)
+        self.assertIs(first, service.users.return_value.messages.return_value)
+        service.users.return_value.messages.assert_called_once_with()
+
+    def test_services_do_not_share_resources(self):
+        service_a, service_b = MagicMock(), MagicMock()
+
+        self.assertIsNot(user_resource(service_a, 'labels'), user_resource(service_b, 'labels'))
+        self.assertIsNot(user_resource(service_a, 'labels'), user_resource(service_a, 'drafts'))
+
+
+if __name__ == '__main__':
+    unittest.main()
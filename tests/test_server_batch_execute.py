@@ -0,0 +1,115 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import asyncio
+
+from src import server
+
+def async_test(f):
+    def wrapper(*args, **kwargs):
+        asyncio.run(f(*args, **kwargs))
+    return wrapper
+
+class TestBatchTools(unittest.TestCase):
+    def test_maps_tool_names_to_functions(self):
+        self.assertEqual(len(server._BATCH_TOOLS), 20)
+        for name, tool in server._BATCH_TOOLS.items():
+            self.assertEqual(tool.__name__, name)
+            self.assertTrue(asyncio.iscoroutinefunction(tool))
+
+    def test_batch_execute_cannot_call_itself(self):
+        self.assertNotIn('batch_execute', server._BATCH_TOOLS)
+
+class TestBatchExecute(unittest.TestCase):
+
+    def setUp(self):
+        self.gmail_client_patch = patch('src.server.gmail_client', new_callable=MagicMock)
+        self.mock_gmail_client = self.gmail_client_patch.start()
+
+        self.logger_patch = patch('src.server.logger', new_callable=MagicMock)
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.gmail_client_patch.stop()
+        self.logger_patch.stop()
+
+    @async_test
+    async def test_results_are_returned_in_call_order(self):
+        self.mock_gmail_client.delete_message.return_value = True
+        self.mock_gmail_client.list_labels.return_value = []
+
+        result = await server.batch_execute([
+            {'tool': 'delete_email', 'args': {'email_id': 'm2'}},
+            {'tool': 'list_gmail_labels'},
+            {'tool': 'delete_email', 'args': {'email_id': 'm1'}},
+        ])
+
+        self.assertEqual(result,
+                         "[1] delete_email:\nEmail with ID m2 deleted successfully.\n\n"
+                         "[2] list_gmail_labels:\nCould not retrieve labels or no labels found.\n\n"
+                         "[3] delete_email:\nEmail with ID m1 deleted successfully.")
+        self.assertEqual([c.args for c in self.mock_gmail_client.delete_message.call_args_list],
+                         [('m2',), ('m1',)])
+
+    @async_test
+    async def test_unknown_tool_is_reported_and_others_still_run(self):
+        self.mock_gmail_client.delete_message.return_value = True
+
+        result = await server.batch_execute([
+            {'tool': 'drop_database'},
+            {'tool': 'delete_email', 'args': {'email_id': 'm1'}},
+        ])
+
+        self.assertIn("[1] drop_database: Error: Unknown tool 'drop_database'", result)
+        self.assertIn("[2] delete_email:\nEmail with ID m1 deleted successfully.", result)
+        self.mock_logger.error.assert_called_once()
+
+    @async_test
+    async def test_args_must_be_a_mapping(self):
+        result = await server.batch_execute([{'tool': 'delete_email', 'args': ['m1']}])
+
+        self.assertEqual(result, "[1] delete_email: Error: 'args' must be an object of keyword arguments, not list")
+        self.mock_gmail_client.delete_message.assert_not_called()
+
+    @async_test
+    async def test_tool_errors_are_reported(self):
+        self.mock_gmail_client.get_message.side_effect = Exception("Gmail API Error")
+
+        result = await server.batch_execute([{'tool': 'get_email', 'args': {'email_id': 'm1'}}])
+
+        self.assertEqual(result, "[1] get_email: Error: Gmail API Error")
+        self.mock_logger.error.assert_called_with("Error in batch_execute call 1 (get_email): Gmail API Error")
+
+    @async_test
+    async def test_stop_on_error_skips_remaining_calls(self):
+        self.mock_gmail_client.get_message.side_effect = Exception("Gmail API Error")
+
+        result = await server.batch_execute([
+            {'tool': 'get_email', 'args': {'email_id': 'm1'}},
+            {'tool': 'delete_email', 'args': {'email_id': 'm2'}},
+            {'tool': 'delete_email', 'args': {'email_id': 'm3'}},
+        ], stop_on_error=True)
+
+        self.assertEqual(result, "[1] get_email: Error: Gmail API Error\n\n"
+                                 "Stopped after call 1; 2 remaining calls were not run.")
+        self.mock_gmail_client.delete_message.assert_not_called()
+
+    @async_test
+    async def test_errors_do_not_stop_the_batch_by_default(self):
+        self.mock_gmail_client.get_message.side_effect = Exception("Gmail API Error")
+        self.mock_gmail_client.delete_message.return_value = True
+
+        result = await server.batch_execute([
+            {'tool': 'get_email', 'args': {'email_id': 'm1'}},
+            {'tool': 'delete_email', 'args': {'email_id': 'm2'}},
+        ])
+
+        self.assertNotIn("Stopped", result)
+        self.mock_gmail_client.delete_message.assert_called_once_with('m2')
+
+    @async_test
+    async def test_no_calls(self):
+        result = await server.batch_execute([])
+        self.assertEqual(result, "You must provide at least one tool call.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import socket
+import unittest
+from unittest.mock import patch
+
+from src import server
+
+class TestFindAvailablePort(unittest.TestCase):
+
+    def setUp(self):
+        self.socket_patch = patch('src.server.socket.socket')
+        self.mock_socket = self.socket_patch.start().return_value.__enter__.return_value
+
+        self.logger_patch = patch('src.server.logger')
+        self.mock_logger = self.logger_patch.start()
+
+    def tearDown(self):
+        self.socket_patch.stop()
+        self.logger_patch.stop()
+
+    def test_skips_ports_in_use(self):
+        self.mock_socket.bind.side_effect = [OSError("in use"), None]
+
+        self.assertEqual(server.find_available_port(8000), 8001)
+
+    def test_no_free_port(self):
+        self.mock_socket.bind.side_effect = OSError("in use")
+
+        self.assertEqual(server.find_available_port(8000, max_attempts=3), -1)
+
+    @patch('src.server.sys.platform', 'linux')
+    def test_reuses_time_wait_ports_on_posix(self):
+        server.find_available_port(8000)
+
+        self.mock_socket.setsockopt.assert_called_once_with(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+    @patch('src.server.sys.platform', 'win32')
+    def test_probe_binds_exclusively_on_windows(self):
+        server.find_available_port(8000)
+
+        self.mock_socket.setsockopt.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()